@@ -0,0 +1,57 @@
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from planning_utils import a_star_flat, neighbor_mask
+
+# arrays attached by each worker process, see _attach
+_shared = {}
+
+
+def _share(array):
+    """
+    Copies array into a new shared memory block and returns the block.
+    """
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block
+
+
+def _attach(grid_spec, mask_spec):
+    """
+    Pool initializer: maps the shared grid and mask into this worker without copying them.
+    """
+    for key, (name, shape, dtype) in (('grid', grid_spec), ('mask', mask_spec)):
+        block = shared_memory.SharedMemory(name=name)
+        _shared[key + '_block'] = block
+        _shared[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+
+def _solve(pair):
+    start, goal = pair
+    return a_star_flat(_shared['grid'], start, goal, mask=_shared['mask'])
+
+
+def batch_a_star(grid, pairs, mask=None, processes=None, chunksize=16):
+    """
+    Solves many (start, goal) queries on one grid with a process pool.
+
+    The grid and its neighbor mask are placed in shared memory once and every
+    worker attaches to them, so no worker receives its own pickled copy.
+    Returns the (path, cost) results in the order of pairs.
+    """
+    grid = np.ascontiguousarray(grid)
+    if mask is None:
+        mask = neighbor_mask(grid)
+    mask = np.ascontiguousarray(mask)
+    grid_block = _share(grid)
+    mask_block = _share(mask)
+    try:
+        specs = ((grid_block.name, grid.shape, grid.dtype.str), (mask_block.name, mask.shape, mask.dtype.str))
+        tasks = [(tuple(int(v) for v in start), tuple(int(v) for v in goal)) for start, goal in pairs]
+        with Pool(processes, initializer=_attach, initargs=specs) as pool:
+            return pool.map(_solve, tasks, chunksize)
+    finally:
+        for block in (grid_block, mask_block):
+            block.close()
+            block.unlink()
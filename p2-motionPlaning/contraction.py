@@ -0,0 +1,210 @@
+import heapq
+import time
+
+import numpy as np
+
+from precomputed import Precomputed
+
+
+class ContractionHierarchy(Precomputed):
+    """
+    Contraction hierarchy over the nodes and edges of a `SkeletonGraph`.
+
+    Nodes are contracted one by one in order of importance (edge difference plus
+    contracted neighbours). Each contraction adds shortcuts that keep shortest
+    path distances between the remaining nodes. A query is then a bidirectional
+    Dijkstra that only climbs to more important nodes and settles a few hundred
+    nodes at most. Shortcuts remember the node they bypass and original edges
+    the skeleton graph edge they stand for (stored as -1 - edge), so paths
+    can be unpacked back to skeleton pixels.
+    """
+
+    def __init__(self, graph, witness_limit=60, rank=None, edges=None):
+        self._graph = graph
+        self._digest = self.source_digest(graph)
+        self._size = len(graph.nodes)
+        self._edges = {}
+        if rank is None:
+            for e, ((u, v), cost) in enumerate(zip(graph.edges.tolist(), graph.costs.tolist())):
+                if u != v:
+                    self._add_edge(u, v, cost, -1 - e)
+            rank = self._contract(witness_limit)
+        else:
+            for u, v, cost, middle in edges:
+                self._add_edge(int(u), int(v), float(cost), int(middle))
+        self._rank = np.asarray(rank)
+        self._up = [[] for _ in range(self._size)]
+        for (u, v), (cost, _) in self._edges.items():
+            if self._rank[u] < self._rank[v]:
+                self._up[u].append((v, cost))
+            else:
+                self._up[v].append((u, cost))
+
+    @staticmethod
+    def source_digest(graph):
+        return graph.digest
+
+    @property
+    def graph(self):
+        return self._graph
+
+    def _add_edge(self, u, v, cost, middle):
+        key = (u, v) if u < v else (v, u)
+        if cost < self._edges.get(key, (np.inf, -1))[0]:
+            self._edges[key] = (cost, middle)
+            return True
+        return False
+
+    def _shortcuts(self, node, adjacency, limit):
+        """
+        Returns the (u, w, cost) shortcuts needed if node were contracted now.
+        """
+        neighbors = list(adjacency[node].items())
+        shortcuts = []
+        for i, (u, cost_u) in enumerate(neighbors):
+            targets = {w: cost_u + cost_w for w, cost_w in neighbors[i + 1:]}
+            if not targets:
+                continue
+            # witness search from u that avoids node, bounded in cost and settled nodes
+            max_cost = max(targets.values())
+            dist = {u: 0.0}
+            queue = [(0.0, u)]
+            settled = 0
+            while queue and settled < limit:
+                d, current = heapq.heappop(queue)
+                if d > dist[current] or d > max_cost:
+                    continue
+                settled += 1
+                for nxt, cost in adjacency[current].items():
+                    if nxt != node and d + cost < dist.get(nxt, np.inf):
+                        dist[nxt] = d + cost
+                        heapq.heappush(queue, (d + cost, nxt))
+            shortcuts += [(u, w, cost) for w, cost in targets.items() if dist.get(w, np.inf) > cost]
+        return shortcuts
+
+    def _contract(self, limit):
+        adjacency = [dict() for _ in range(self._size)]
+        for (u, v), (cost, _) in self._edges.items():
+            adjacency[u][v] = cost
+            adjacency[v][u] = cost
+        contracted_neighbors = [0] * self._size
+
+        def priority(node):
+            return len(self._shortcuts(node, adjacency, limit)) - len(adjacency[node]) + contracted_neighbors[node]
+
+        queue = [(priority(n), n) for n in range(self._size)]
+        heapq.heapify(queue)
+        rank = np.zeros(self._size, dtype=np.int32)
+        order = 0
+        while queue:
+            _, node = heapq.heappop(queue)
+            # lazy update: re-queue the node if its priority got worse than the next one
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+            for u, w, cost in self._shortcuts(node, adjacency, limit):
+                if self._add_edge(u, w, cost, node):
+                    adjacency[u][w] = adjacency[w][u] = cost
+            for neighbor in adjacency[node]:
+                del adjacency[neighbor][node]
+                contracted_neighbors[neighbor] += 1
+            adjacency[node] = {}
+            rank[node] = order
+            order += 1
+        return rank
+
+    def _unpack(self, u, v):
+        """
+        Returns the (node, skeleton graph edge) steps after u along the edge or shortcut from u to v.
+        """
+        steps = []
+        stack = [(u, v)]
+        while stack:
+            a, b = stack.pop()
+            middle = self._edges[(a, b) if a < b else (b, a)][1]
+            if middle < 0:
+                steps.append((b, -1 - middle))
+            else:
+                stack += [(middle, b), (a, middle)]
+        return steps
+
+    def plan(self, start, goal, stats=None):
+        """
+        Returns the path between two skeleton pixels and its cost.
+
+        Pass a `SearchStats` as stats to collect counters and timings of both search directions.
+        """
+        search_start = time.perf_counter()
+        start, goal = tuple(int(v) for v in start), tuple(int(v) for v in goal)
+        direct_path, best_cost = self._graph.direct(start, goal)
+        dists = ({}, {})
+        parents = ({}, {})
+        queues = ([], [])
+        for side, pixel in enumerate((start, goal)):
+            for node, cost in self._graph.anchors(pixel):
+                if cost < dists[side].get(node, np.inf):
+                    dists[side][node], parents[side][node] = cost, None
+                    heapq.heappush(queues[side], (cost, node))
+        meeting = None
+        pushed = peak_open = len(queues[0]) + len(queues[1])
+        expanded = 0
+        while queues[0] or queues[1]:
+            side = 0 if not queues[1] or (queues[0] and queues[0][0][0] <= queues[1][0][0]) else 1
+            d, current = heapq.heappop(queues[side])
+            if d >= best_cost:
+                # nothing left on this side can improve the meeting point
+                queues[side][:] = []
+                continue
+            if d > dists[side][current]:
+                continue
+            expanded += 1
+            if current in dists[1 - side] and d + dists[1 - side][current] < best_cost:
+                best_cost, meeting = d + dists[1 - side][current], current
+            for nxt, cost in self._up[current]:
+                if d + cost < dists[side].get(nxt, np.inf):
+                    dists[side][nxt] = d + cost
+                    parents[side][nxt] = current
+                    heapq.heappush(queues[side], (d + cost, nxt))
+                    pushed += 1
+            peak_open = max(peak_open, len(queues[0]) + len(queues[1]))
+
+        reconstruction_start = time.perf_counter()
+        path = self._path(start, goal, meeting, parents, direct_path) if best_cost < np.inf else []
+        if stats is not None:
+            stats.record(expanded, pushed, peak_open, search_start, reconstruction_start)
+        if not path:
+            print('**********************')
+            print('Failed to find a path!')
+            print('**********************')
+            return [], 0
+        print('Found a path.')
+        return path, best_cost
+
+    def _path(self, start, goal, meeting, parents, direct_path):
+        """
+        Returns the skeleton pixels of the path through meeting, or direct_path if the searches never met.
+        """
+        if meeting is None:
+            return direct_path
+        chain = [meeting]
+        while parents[0][chain[-1]] is not None:
+            chain.append(parents[0][chain[-1]])
+        chain.reverse()
+        while parents[1][chain[-1]] is not None:
+            chain.append(parents[1][chain[-1]])
+        parent = {chain[0]: None}
+        for u, v in zip(chain[:-1], chain[1:]):
+            previous = u
+            for node, e in self._unpack(u, v):
+                parent[node] = (previous, e)
+                previous = node
+        return self._graph.route(start, goal, chain[-1], parent)
+
+    def _arrays(self):
+        edges = [(u, v, cost, middle) for (u, v), (cost, middle) in self._edges.items()]
+        return {'rank': self._rank, 'edges': np.array(edges, dtype=np.float64).reshape(-1, 4)}
+
+    @classmethod
+    def _restore(cls, graph, arrays):
+        return cls(graph, rank=arrays['rank'], edges=arrays['edges'].tolist())
@@ -0,0 +1,172 @@
+import heapq
+import time
+
+import numpy as np
+
+from planning_utils import Action, neighbor_mask, octile, _SUCCESSORS
+
+# (bit, dx, dy, cost) for every action, used to find the cells that can move into a cell
+_MOVES = [(bit, a.delta[0], a.delta[1], float(a.cost)) for bit, a in enumerate(Action)]
+
+
+class DStarLite:
+    """
+    Incremental grid planner (D* Lite) that keeps its search state between calls.
+
+    The search runs backwards from the goal, so when the drone moves along the
+    path (`move_to`) or cells of the grid change (`update_cells`) only the
+    affected part of the solution is repaired by the next `plan` call instead
+    of searching from scratch.
+
+        planner = DStarLite(grid, start, goal)
+        path, cost = planner.plan()
+        ...
+        planner.move_to(current_cell)
+        planner.update_cells(no_fly_cells)
+        path, cost = planner.plan()
+    """
+
+    def __init__(self, grid, start, goal):
+        self._grid = np.array(grid)
+        self._mask = neighbor_mask(self._grid)
+        self._start = tuple(start)
+        self._goal = tuple(goal)
+        self._last = self._start
+        self._km = 0.0
+        self._g = {}
+        self._rhs = {self._goal: 0.0}
+        self._queue = []
+        self._queued = {}
+        self._pushed = 0
+        self._push(self._goal)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @property
+    def start(self):
+        return self._start
+
+    def _key(self, node):
+        cost = min(self._g.get(node, np.inf), self._rhs.get(node, np.inf))
+        # rounded so that keys equal in exact arithmetic also tie in floating point,
+        # otherwise the termination test can stop before an inconsistent node on the path
+        return round(cost + octile(self._start, node) + self._km, 9), cost
+
+    def _push(self, node):
+        key = self._key(node)
+        self._queued[node] = key
+        heapq.heappush(self._queue, (key, node))
+        self._pushed += 1
+
+    def _successors(self, node):
+        x, y = node
+        return [((x + dx, y + dy), cost) for dx, dy, cost in _SUCCESSORS[self._mask[x, y]]]
+
+    def _predecessors(self, node):
+        x, y = node
+        rows, cols = self._mask.shape
+        cells = []
+        for bit, dx, dy, cost in _MOVES:
+            px, py = x - dx, y - dy
+            if 0 <= px < rows and 0 <= py < cols and self._mask[px, py] >> bit & 1:
+                cells.append(((px, py), cost))
+        return cells
+
+    def _update_vertex(self, node):
+        if node != self._goal:
+            self._rhs[node] = min([cost + self._g.get(s, np.inf) for s, cost in self._successors(node)] or [np.inf])
+        self._queued.pop(node, None)
+        if self._g.get(node, np.inf) != self._rhs.get(node, np.inf):
+            self._push(node)
+
+    def _compute_shortest_path(self):
+        """
+        Repairs the search until the start is consistent and returns the number of expanded nodes and the peak
+        queue length.
+        """
+        expanded = peak_open = 0
+        while self._queue:
+            key, node = self._queue[0]
+            if self._queued.get(node) != key:
+                heapq.heappop(self._queue)
+                continue
+            start_rhs = self._rhs.get(self._start, np.inf)
+            if key >= self._key(self._start) and start_rhs == self._g.get(self._start, np.inf):
+                break
+            heapq.heappop(self._queue)
+            del self._queued[node]
+            expanded += 1
+
+            new_key = self._key(node)
+            g = self._g.get(node, np.inf)
+            rhs = self._rhs.get(node, np.inf)
+            if key < new_key:
+                self._push(node)
+            elif g > rhs:
+                self._g[node] = rhs
+                for p, _ in self._predecessors(node):
+                    self._update_vertex(p)
+            else:
+                self._g[node] = np.inf
+                self._update_vertex(node)
+                for p, _ in self._predecessors(node):
+                    self._update_vertex(p)
+            peak_open = max(peak_open, len(self._queue))
+        return expanded, peak_open
+
+    def plan(self, stats=None):
+        """
+        Repairs the search and returns the path from the current start to goal and its cost.
+
+        Pass a `SearchStats` as stats to collect the counters and timings of this repair.
+        """
+        search_start = time.perf_counter()
+        pushed_before = self._pushed
+        expanded, peak_open = self._compute_shortest_path()
+        reconstruction_start = time.perf_counter()
+        cost = self._rhs.get(self._start, np.inf)
+        path = []
+        if not np.isfinite(cost):
+            print('**********************')
+            print('Failed to find a path!')
+            print('**********************')
+            cost = 0
+        else:
+            path = [self._start]
+            while path[-1] != self._goal and len(path) <= self._grid.size:
+                path.append(min(self._successors(path[-1]), key=lambda s: s[1] + self._g.get(s[0], np.inf))[0])
+            print('Found a path.')
+        if stats is not None:
+            stats.record(expanded, self._pushed - pushed_before, peak_open, search_start, reconstruction_start)
+        return path, cost
+
+    def move_to(self, node):
+        """
+        Moves the start of the search to node, e.g. the drone's current grid cell.
+        """
+        node = tuple(node)
+        self._km += octile(self._last, node)
+        self._last = node
+        self._start = node
+
+    def update_cells(self, cells, occupied=True):
+        """
+        Marks cells as occupied (or free) and schedules the affected nodes for repair.
+        """
+        rows, cols = self._grid.shape
+        affected = set()
+        for x, y in cells:
+            self._grid[x, y] = 1 if occupied else 0
+        for x, y in cells:
+            # the moves out of the 3x3 neighbourhood depend on the cells one further out
+            r0, r1 = max(x - 2, 0), min(x + 3, rows)
+            c0, c1 = max(y - 2, 0), min(y + 3, cols)
+            a0, a1 = max(x - 1, 0), min(x + 2, rows)
+            b0, b1 = max(y - 1, 0), min(y + 2, cols)
+            window = neighbor_mask(self._grid[r0:r1, c0:c1])
+            self._mask[a0:a1, b0:b1] = window[a0 - r0:a1 - r0, b0 - c0:b1 - c0]
+            affected.update((a, b) for a in range(a0, a1) for b in range(b0, b1))
+        for node in affected:
+            self._update_vertex(node)
@@ -1,16 +1,15 @@
 import numpy as np
+from scipy.ndimage import distance_transform_edt
 from scipy.spatial import Voronoi
 from bresenham import bresenham
 
 
 
-def create_grid(data, drone_altitude, safety_distance):
+def grid_bounds(data):
     """
-    Returns a grid representation of a 2D configuration space
-    based on given obstacle data, drone altitude and safety distance
-    arguments.
+    Returns the north and east minimum of the obstacle data and the
+    (north_size, east_size) shape of a grid covering all obstacles.
     """
-
     # minimum and maximum north coordinates
     north_min = np.floor(np.min(data[:, 0] - data[:, 3]))
     north_max = np.ceil(np.max(data[:, 0] + data[:, 3]))
@@ -23,20 +22,210 @@ def create_grid(data, drone_altitude, safety_distance):
     # calculate the size of the grid.
     north_size = int(np.ceil(north_max - north_min))
     east_size = int(np.ceil(east_max - east_min))
+    return north_min, east_min, (north_size, east_size)
+
+
+def obstacle_cells(data, north_min, east_min, shape, safety_distance):
+    """
+    Returns the first and last row and column covered by every obstacle
+    grown by safety_distance, as an (N, 4) int array clipped to the grid.
+    """
+    north, east, d_north, d_east = data[:, 0], data[:, 1], data[:, 3], data[:, 4]
+    rows = np.clip([north - d_north - safety_distance - north_min,
+                    north + d_north + safety_distance - north_min], 0, shape[0] - 1)
+    cols = np.clip([east - d_east - safety_distance - east_min,
+                    east + d_east + safety_distance - east_min], 0, shape[1] - 1)
+    # truncate like int() does, the values are non-negative after clipping
+    return np.vstack([rows, cols]).T.astype(int)
 
-    # Initialize an empty grid
-    grid = np.zeros((north_size, east_size))
-
-    # Populate the grid with obstacles
-    for i in range(data.shape[0]):
-        north, east, alt, d_north, d_east, d_alt = data[i, :]
-        if alt + d_alt + safety_distance > drone_altitude:
-            obstacle = [
-                int(np.clip(north - d_north - safety_distance - north_min, 0, north_size-1)),
-                int(np.clip(north + d_north + safety_distance - north_min, 0, north_size-1)),
-                int(np.clip(east - d_east - safety_distance - east_min, 0, east_size-1)),
-                int(np.clip(east + d_east + safety_distance - east_min, 0, east_size-1)),
-            ]
-            grid[obstacle[0]:obstacle[1]+1, obstacle[2]:obstacle[3]+1] = 1
+
+def rasterize(cells, shape):
+    """
+    Returns a boolean array of the given shape that is True inside any of
+    the (first row, last row, first col, last col) boxes in cells.
+
+    Every box adds +1/-1 at its corners to a 2D difference array, and two
+    cumulative sums turn that into the number of boxes covering each cell.
+    """
+    n0, n1, e0, e1 = cells.T
+    diff = np.zeros((shape[0] + 1, shape[1] + 1), dtype=np.int32)
+    np.add.at(diff, (n0, e0), 1)
+    np.add.at(diff, (n0, e1 + 1), -1)
+    np.add.at(diff, (n1 + 1, e0), -1)
+    np.add.at(diff, (n1 + 1, e1 + 1), 1)
+    return np.cumsum(np.cumsum(diff, axis=0), axis=1)[:-1, :-1] > 0
+
+
+def box_cells(cells, shape):
+    """
+    Returns the flat index of every grid cell inside the boxes in cells,
+    together with the index of the box each of them belongs to.
+    """
+    n0, n1, e0, e1 = cells.T
+    widths = e1 - e0 + 1
+    sizes = (n1 - n0 + 1) * widths
+    box = np.repeat(np.arange(len(cells)), sizes)
+    # position of each cell within its own box
+    offset = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    rows = n0[box] + offset // widths[box]
+    cols = e0[box] + offset % widths[box]
+    return rows * shape[1] + cols, box
+
+
+def create_height_map(data, safety_distance=0):
+    """
+    Returns a 2.5D map holding for every cell the highest obstacle top
+    (alt + d_alt + safety_distance) of the obstacles grown by
+    safety_distance that cover it, 0 where there is none, along with the
+    north and east offsets of the grid.
+
+    The occupancy grid for any drone altitude >= 0 is then a single
+    comparison, see `grid_from_height_map`.
+    """
+    north_min, east_min, shape = grid_bounds(data)
+    cells = obstacle_cells(data, north_min, east_min, shape, safety_distance)
+    flat, box = box_cells(cells, shape)
+    heights = np.zeros(shape[0] * shape[1])
+    np.maximum.at(heights, flat, (data[:, 2] + data[:, 5] + safety_distance)[box])
+    return heights.reshape(shape), int(north_min), int(east_min)
+
+
+def grid_from_height_map(heights, drone_altitude):
+    """
+    Returns the occupancy grid of a height map for the given drone altitude,
+    the same grid `create_grid` builds for the safety distance of the map.
+    """
+    return (heights > drone_altitude).astype(np.float64)
+
+
+def create_grid(data, drone_altitude, safety_distance):
+    """
+    Returns a grid representation of a 2D configuration space
+    based on given obstacle data, drone altitude and safety distance
+    arguments.
+    """
+    north_min, east_min, shape = grid_bounds(data)
+
+    # Populate the grid with the obstacles reaching the drone altitude, all at once
+    tall = data[:, 2] + data[:, 5] + safety_distance > drone_altitude
+    cells = obstacle_cells(data[tall], north_min, east_min, shape, safety_distance)
+    grid = rasterize(cells, shape).astype(np.float64)
 
     return grid, int(north_min), int(east_min)
+
+
+def clearance_map(grid):
+    """
+    Returns the Euclidean distance in cells from every cell to the nearest
+    obstacle cell of grid (0 on obstacles), as a float32 array.
+
+    Built once from a grid without safety margin, it gives the grid for any
+    safety distance with `inflate` and the clearance of paths with
+    `path_clearance`.
+    """
+    return distance_transform_edt(np.asarray(grid) != 1).astype(np.float32)
+
+
+def inflate(clearance, safety_distance):
+    """
+    Returns the occupancy grid with every obstacle grown by safety_distance.
+
+    Obstacles grow by a Euclidean radius, so unlike `create_grid` the corners
+    of the grown boxes are rounded.
+    """
+    return (clearance <= safety_distance).astype(np.float64)
+
+
+def path_clearance(clearance, path):
+    """
+    Returns the smallest clearance along the straight segments between the
+    waypoints of path (grid cells), e.g. to check a pruned path against a
+    safety distance.
+    """
+    if len(path) == 0:
+        return 0.0
+    points = np.asarray(path, dtype=float)[:, :2]
+    cells = [points[:1]]
+    for p1, p2 in zip(points[:-1], points[1:]):
+        steps = int(np.abs(p2 - p1).max())
+        t = np.arange(1, steps + 1)[:, None] / max(steps, 1)
+        cells.append(p1 + t * (p2 - p1))
+    cells = np.floor(np.concatenate(cells) + 0.5).astype(int)
+    return float(clearance[cells[:, 0], cells[:, 1]].min())
+
+
+class OccupancyGrid:
+    """
+    Occupancy grid stored with one uint8 per cell (0 free, 1 obstacle), or
+    with one bit per cell when packed.
+
+    An unpacked grid is 8 times smaller than the float64 grid from
+    `create_grid`, a packed one 64 times. `unpack()` returns the uint8
+    cells, without a copy unless the grid is packed, so it can be passed to
+    the planners directly. Indexing and np.asarray work as on the array.
+
+    Packed grids are meant for storage. Reading a single cell does not
+    unpack them, but any other key or np.asarray unpacks the whole grid on
+    every call, so call `unpack()` once before planning on a packed grid.
+    """
+
+    def __init__(self, grid, packed=False):
+        grid = np.asarray(grid)
+        self._shape = grid.shape
+        self._packed = packed
+        if grid.dtype == np.uint8 and not packed:
+            # already 0/1 cells, e.g. a memory-mapped grid from a map bundle
+            self._data = grid
+            return
+        occupied = np.ascontiguousarray(grid == 1)
+        self._data = np.packbits(occupied, axis=None) if packed else occupied.view(np.uint8)
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def packed(self):
+        return self._packed
+
+    @property
+    def nbytes(self):
+        return self._data.nbytes
+
+    def unpack(self):
+        """
+        Returns the grid as a uint8 array of 0 (free) and 1 (obstacle).
+        """
+        if not self._packed:
+            return self._data
+        return np.unpackbits(self._data, count=self._shape[0] * self._shape[1]).reshape(self._shape)
+
+    def free(self):
+        """
+        Returns a boolean array that is True on free cells.
+        """
+        return self.unpack() == 0
+
+    def pack(self):
+        """
+        Returns the bit-packed version of this grid.
+        """
+        return self if self._packed else OccupancyGrid(self._data, packed=True)
+
+    def __len__(self):
+        return self._shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        cells = self.unpack()
+        return cells if dtype is None else cells.astype(dtype)
+
+    def __getitem__(self, key):
+        if self._packed and isinstance(key, tuple) and len(key) == 2 and \
+                all(isinstance(k, (int, np.integer)) for k in key):
+            # read a single bit without unpacking the grid
+            if not all(-n <= k < n for k, n in zip(key, self._shape)):
+                raise IndexError('cell {0} is outside the grid of shape {1}'.format(key, self._shape))
+            row, col = (int(k) % n for k, n in zip(key, self._shape))
+            index = row * self._shape[1] + col
+            return int(self._data[index >> 3] >> (7 - (index & 7)) & 1)
+        return self.unpack()[key]
@@ -0,0 +1,241 @@
+import heapq
+import time
+
+import numpy as np
+
+from planning_utils import distance_field, field_path, neighbor_mask, octile
+from precomputed import Precomputed
+
+
+class HierarchicalPlanner(Precomputed):
+    """
+    Hierarchical path-finding (HPA*) over an occupancy grid.
+
+    The grid is split into square clusters. Every run of free cells along a
+    cluster border gets one or two entrances, and entrances inside a cluster
+    are connected by their exact in-cluster distance. Queries search this
+    small abstract graph and only refine the segments of the result back to
+    cells. Paths are near-optimal: they are optimal on the abstract graph.
+
+    The abstract graph can be kept on disk with `save`, `load` and `cached`.
+    """
+
+    def __init__(self, grid, cluster_size=32, nodes=None, edges=None):
+        self._grid = grid
+        self._mask = neighbor_mask(grid)
+        self._cluster_size = cluster_size
+        self._digest = self.source_digest(grid)
+        if nodes is None:
+            nodes, edges = self._build()
+        self._nodes = [tuple(n) for n in np.asarray(nodes, dtype=int).tolist()]
+        self._edges = [dict() for _ in self._nodes]
+        for u, v, cost in edges:
+            self._edges[int(u)][int(v)] = cost
+            self._edges[int(v)][int(u)] = cost
+        self._cluster_nodes = {}
+        for i, n in enumerate(self._nodes):
+            self._cluster_nodes.setdefault(self._cluster(n), []).append(i)
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def cluster_size(self):
+        return self._cluster_size
+
+    def _cluster(self, node):
+        return node[0] // self._cluster_size, node[1] // self._cluster_size
+
+    def _window(self, cluster):
+        size = self._cluster_size
+        r0, c0 = cluster[0] * size, cluster[1] * size
+        r1 = min(r0 + size, self._mask.shape[0])
+        c1 = min(c0 + size, self._mask.shape[1])
+        return r0, r1, c0, c1
+
+    def _window_field(self, cluster, node, window_mask=None):
+        """
+        Returns the in-cluster distance field from node, in window coordinates.
+        """
+        r0, r1, c0, c1 = self._window(cluster)
+        return distance_field(self._grid[r0:r1, c0:c1], (node[0] - r0, node[1] - c0), window_mask)
+
+    def _entrances(self):
+        """
+        Returns the pairs of adjacent free cells chosen as border crossings.
+        """
+        free = np.asarray(self._grid) != 1
+        rows, cols = free.shape
+        size = self._cluster_size
+        pairs = []
+        # vertical borders between horizontally adjacent clusters, then horizontal ones
+        for border in range(size, cols, size):
+            crossing = free[:, border - 1] & free[:, border]
+            pairs += [((r, border - 1), (r, border)) for r in self._transitions(crossing, rows)]
+        for border in range(size, rows, size):
+            crossing = free[border - 1, :] & free[border, :]
+            pairs += [((border - 1, c), (border, c)) for c in self._transitions(crossing, cols)]
+        return pairs
+
+    def _transitions(self, crossing, length):
+        """
+        Returns the positions along a border where entrances are placed: the middle
+        of short free runs and both ends of long ones. Runs never span two clusters.
+        """
+        positions = []
+        for start in range(0, length, self._cluster_size):
+            segment = crossing[start:start + self._cluster_size]
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], segment.astype(np.int8), [0]))))
+            for run_start, run_end in zip(edges[::2], edges[1::2]):
+                if run_end - run_start < 6:
+                    positions.append(start + (run_start + run_end - 1) // 2)
+                else:
+                    positions += [start + run_start, start + run_end - 1]
+        return positions
+
+    def _build(self):
+        node_ids = {}
+        edges = []
+        for a, b in self._entrances():
+            for n in (a, b):
+                node_ids.setdefault(n, len(node_ids))
+            edges.append((node_ids[a], node_ids[b], 1.0))
+
+        nodes = sorted(node_ids, key=node_ids.get)
+        by_cluster = {}
+        for n in nodes:
+            by_cluster.setdefault(self._cluster(n), []).append(n)
+        for cluster, members in by_cluster.items():
+            r0, r1, c0, c1 = self._window(cluster)
+            window_mask = neighbor_mask(self._grid[r0:r1, c0:c1])
+            for i, a in enumerate(members):
+                cost, _ = self._window_field(cluster, a, window_mask)
+                for b in members[i + 1:]:
+                    d = cost[b[0] - r0, b[1] - c0]
+                    if np.isfinite(d):
+                        edges.append((node_ids[a], node_ids[b], float(d)))
+        return np.array(nodes, dtype=np.int32).reshape(-1, 2), edges
+
+    def _connect(self, node):
+        """
+        Returns the in-cluster costs from node to the entrances of its cluster.
+        """
+        cluster = self._cluster(node)
+        r0, _, c0, _ = self._window(cluster)
+        cost, _ = self._window_field(cluster, node)
+        links = {}
+        for i in self._cluster_nodes.get(cluster, []):
+            n = self._nodes[i]
+            d = cost[n[0] - r0, n[1] - c0]
+            if np.isfinite(d):
+                links[i] = float(d)
+        return links
+
+    def _refine(self, a, b):
+        """
+        Returns the cells from a to b (excluding a); both lie in the same cluster or are adjacent.
+        """
+        if self._cluster(a) != self._cluster(b):
+            return [b]
+        cluster = self._cluster(a)
+        r0, _, c0, _ = self._window(cluster)
+        cost, parent = self._window_field(cluster, a)
+        cells, _ = field_path(cost, parent, (b[0] - r0, b[1] - c0))
+        return [(row + r0, col + c0) for row, col in cells[1:]]
+
+    def plan(self, start, goal, refine=True, stats=None):
+        """
+        Returns a path from start to goal and its cost.
+
+        With refine=False the path only holds start, the entrances used and
+        goal. Pass a `SearchStats` as stats to collect the counters of the
+        abstract search; refining the path counts as reconstruction.
+        """
+        search_start = time.perf_counter()
+        start, goal = tuple(start), tuple(goal)
+        if start == goal:
+            return [start], 0.0
+        start_links = self._connect(start)
+        goal_links = self._connect(goal)
+        if self._cluster(start) == self._cluster(goal):
+            # direct route inside the shared cluster, if there is one
+            r0, _, c0, _ = self._window(self._cluster(start))
+            cost, _ = self._window_field(self._cluster(start), start)
+            direct = float(cost[goal[0] - r0, goal[1] - c0])
+        else:
+            direct = np.inf
+
+        # abstract search; -1 and -2 are the temporary start and goal nodes
+        def position(i):
+            return start if i == -1 else goal if i == -2 else self._nodes[i]
+
+        queue = [(octile(start, goal), -1)]
+        g_cost = {-1: 0.0}
+        branch = {-1: None}
+        closed = set()
+        pushed = peak_open = 1
+        while queue:
+            _, current = heapq.heappop(queue)
+            if current in closed:
+                continue
+            closed.add(current)
+            if current == -2:
+                break
+            if current == -1:
+                neighbors = start_links.items()
+            else:
+                neighbors = list(self._edges[current].items())
+                if current in goal_links:
+                    neighbors.append((-2, goal_links[current]))
+            for next_node, cost in neighbors:
+                if next_node in closed:
+                    continue
+                branch_cost = g_cost[current] + cost
+                if branch_cost < g_cost.get(next_node, np.inf):
+                    g_cost[next_node] = branch_cost
+                    branch[next_node] = current
+                    heapq.heappush(queue, (branch_cost + octile(position(next_node), goal), next_node))
+                    pushed += 1
+            peak_open = max(peak_open, len(queue))
+
+        reconstruction_start = time.perf_counter()
+        abstract_cost = g_cost.get(-2, np.inf)
+        if not np.isfinite(abstract_cost) and not np.isfinite(direct):
+            print('**********************')
+            print('Failed to find a path!')
+            print('**********************')
+            if stats is not None:
+                stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+            return [], 0
+
+        print('Found a path.')
+        if direct <= abstract_cost:
+            waypoints = [start, goal]
+            path_cost = float(direct)
+        else:
+            ids = [-2]
+            while branch[ids[-1]] is not None:
+                ids.append(branch[ids[-1]])
+            waypoints = [position(i) for i in reversed(ids)]
+            path_cost = abstract_cost
+        path = waypoints
+        if refine:
+            path = [start]
+            for a, b in zip(waypoints[:-1], waypoints[1:]):
+                path += self._refine(a, b)
+        if stats is not None:
+            stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+        return path, path_cost
+
+    def _params(self):
+        return {'cluster_size': self._cluster_size}
+
+    def _arrays(self):
+        edges = [(u, v, cost) for u, links in enumerate(self._edges) for v, cost in links.items() if u < v]
+        return {'cluster_size': self._cluster_size, 'nodes': np.array(self._nodes, dtype=np.int32).reshape(-1, 2),
+                'edges': np.array(edges, dtype=np.float64).reshape(-1, 3)}
+
+    @classmethod
+    def _restore(cls, grid, arrays):
+        return cls(grid, int(arrays['cluster_size']), arrays['nodes'], arrays['edges'].tolist())
@@ -0,0 +1,83 @@
+import numpy as np
+
+from planning_utils import distance_field, heuristic_field, neighbor_mask, octile
+from precomputed import Precomputed
+
+
+class LandmarkHeuristic(Precomputed):
+    """
+    ALT heuristic (A*, Landmarks, Triangle inequality) for a fixed grid.
+
+    Distance fields to a handful of landmarks spread over the free space are
+    computed once. For any landmark L, |d(L, goal) - d(L, node)| is a lower
+    bound on d(node, goal), and the maximum over all landmarks (and the
+    octile distance) is an admissible, consistent heuristic that follows the
+    obstacles instead of ignoring them.
+
+    An instance can be passed to `a_star` as `h` directly, or `field(goal)`
+    can be used to build the full heuristic array once per goal. The
+    distance fields can be kept on disk with `save`, `load` and `cached`.
+    """
+
+    def __init__(self, grid, num_landmarks=8, mask=None, landmarks=None, distances=None):
+        self._shape = np.shape(grid)
+        self._digest = self.source_digest(grid)
+        if landmarks is None:
+            landmarks, distances = self._select(grid, num_landmarks, mask)
+        self._landmarks = [tuple(n) for n in np.asarray(landmarks, dtype=int).tolist()]
+        self._distances = distances
+
+    @property
+    def landmarks(self):
+        return self._landmarks
+
+    def _select(self, grid, num_landmarks, mask):
+        """
+        Picks landmarks by farthest-point selection and returns them with their distance fields.
+        """
+        if mask is None:
+            mask = neighbor_mask(grid)
+        free = np.argwhere(np.asarray(grid) != 1)
+        centre = free[np.abs(free - np.array(self._shape) / 2).sum(axis=1).argmin()]
+        seed, _ = distance_field(grid, tuple(centre), mask)
+        # the first landmark is the reachable cell farthest from the centre of the map
+        reachable = np.isfinite(seed)
+        candidate = np.unravel_index(np.where(reachable, seed, -1).argmax(), self._shape)
+
+        landmarks, distances = [], []
+        closest = np.full(self._shape, np.inf, dtype=np.float32)
+        for _ in range(num_landmarks):
+            landmarks.append(candidate)
+            cost, _ = distance_field(grid, candidate, mask)
+            distances.append(cost)
+            closest = np.minimum(closest, cost)
+            candidate = np.unravel_index(np.where(reachable, closest, -1).argmax(), self._shape)
+        return np.array(landmarks), np.stack(distances)
+
+    def __call__(self, node, goal):
+        a = self._distances[:, node[0], node[1]]
+        b = self._distances[:, goal[0], goal[1]]
+        with np.errstate(invalid='ignore'):
+            bound = np.abs(a - b)
+        bound = bound[np.isfinite(bound)]
+        return max(float(bound.max()) if bound.size else 0.0, octile(node, goal))
+
+    def field(self, goal):
+        """
+        Returns the heuristic for every cell of the grid towards goal as a float32 array.
+        """
+        goal_distances = self._distances[:, goal[0], goal[1]][:, None, None]
+        with np.errstate(invalid='ignore'):
+            bound = np.abs(self._distances - goal_distances)
+        bound[~np.isfinite(bound)] = 0
+        return np.maximum(bound.max(axis=0), heuristic_field(self._shape, goal))
+
+    def _params(self):
+        return {'num_landmarks': len(self._landmarks)}
+
+    def _arrays(self):
+        return {'landmarks': np.array(self._landmarks, dtype=np.int32), 'distances': self._distances}
+
+    @classmethod
+    def _restore(cls, grid, arrays):
+        return cls(grid, landmarks=arrays['landmarks'], distances=arrays['distances'])
@@ -0,0 +1,197 @@
+import json
+import os
+
+import numpy as np
+from skimage.morphology import medial_axis
+
+from grid import create_height_map, grid_bounds, grid_from_height_map
+from hierarchical import HierarchicalPlanner
+from landmarks import LandmarkHeuristic
+from planning_utils import SkeletonIndex, timed
+from skeleton import SkeletonGraph
+
+# bump whenever the layout or contents of a bundle change
+BUNDLE_VERSION = 2
+
+
+def read_home(filename):
+    """
+    Returns (lat0, lon0) from the header line of a colliders file,
+    e.g. 'lat0 37.792480, lon0 -122.397450'.
+    """
+    with open(filename) as f:
+        fields = f.readline().replace(',', ' ').split()
+    values = dict(zip(fields[::2], fields[1::2]))
+    return float(values['lat0']), float(values['lon0'])
+
+
+def _layer(name, drone_altitude, safety_distance, extension='npy'):
+    return '{0}_{1:g}_{2:g}.{3}'.format(name, drone_altitude, safety_distance, extension)
+
+
+def _height_layer(safety_distance):
+    return 'height_map_{0:g}.npy'.format(safety_distance)
+
+
+def compile_map(colliders, directory, configs=((5, 5),), timings=None):
+    """
+    Compiles a colliders file into a bundle directory.
+
+    The bundle holds the collider array, a height map for every safety
+    distance, and the uint8 occupancy grid and medial-axis skeleton for
+    every (drone_altitude, safety_distance) pair in configs as .npy files.
+    Each grid is its height map thresholded at the altitude, the same grid
+    `create_grid` builds. meta.json records the
+    bundle version, home position, grid offsets and the size and
+    modification time of the source file. It is written last, so an
+    interrupted compile is rebuilt on the next open.
+
+    If timings is a dict, the wall time of each phase (load_csv,
+    create_height_map, create_grid, medial_axis) is added to it.
+    """
+    if timings is None:
+        timings = {}
+    os.makedirs(directory, exist_ok=True)
+    meta_file = os.path.join(directory, 'meta.json')
+    if os.path.exists(meta_file):
+        os.remove(meta_file)
+
+    stat = os.stat(colliders)
+    lat0, lon0 = read_home(colliders)
+    with timed(timings, 'load_csv'):
+        data = np.loadtxt(colliders, delimiter=',', dtype=np.float64, skiprows=2)
+    np.save(os.path.join(directory, 'colliders.npy'), data)
+    north_offset, east_offset, _ = grid_bounds(data)
+    heights = {}
+    for drone_altitude, safety_distance in configs:
+        if safety_distance not in heights:
+            with timed(timings, 'create_height_map'):
+                heights[safety_distance], _, _ = create_height_map(data, safety_distance)
+            np.save(os.path.join(directory, _height_layer(safety_distance)), heights[safety_distance])
+        with timed(timings, 'create_grid'):
+            grid = grid_from_height_map(heights[safety_distance], drone_altitude).astype(np.uint8)
+        np.save(os.path.join(directory, _layer('grid', drone_altitude, safety_distance)), grid)
+        with timed(timings, 'medial_axis'):
+            skeleton = medial_axis(grid == 0)
+        np.save(os.path.join(directory, _layer('skeleton', drone_altitude, safety_distance)), skeleton)
+
+    meta = {'version': BUNDLE_VERSION, 'source': os.path.abspath(colliders), 'source_size': stat.st_size,
+            'source_mtime': stat.st_mtime_ns, 'lat0': lat0, 'lon0': lon0, 'north_offset': int(north_offset),
+            'east_offset': int(east_offset), 'configs': [[float(a), float(s)] for a, s in configs]}
+    with open(meta_file + '.tmp', 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_file + '.tmp', meta_file)
+
+
+class MapBundle:
+    """
+    Compiled map written by `compile_map`, with its arrays loaded as
+    read-only memory maps so opening it takes milliseconds.
+
+    `MapBundle.open` recompiles the bundle first when it is missing, of
+    another version, lacks a requested configuration or the colliders
+    file changed since it was built.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self._indexes = {}
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self._meta = json.load(f)
+        if self._meta['version'] != BUNDLE_VERSION:
+            raise ValueError('{0} is a version {1} bundle, expected {2}'.format(
+                directory, self._meta['version'], BUNDLE_VERSION))
+
+    @classmethod
+    def open(cls, colliders, directory='map_bundle', configs=((5, 5),), timings=None):
+        """
+        Returns the bundle for colliders, compiling it first if it is out of
+        date. timings is passed on to `compile_map`.
+        """
+        configs = [(float(a), float(s)) for a, s in configs]
+        try:
+            bundle = cls(directory)
+            if not bundle.stale(colliders, configs):
+                return bundle
+            if not bundle.stale(colliders):
+                # same map, keep the configurations compiled so far
+                configs += [tuple(c) for c in bundle._meta['configs'] if tuple(c) not in configs]
+        except (OSError, ValueError, KeyError):
+            pass
+        print('Compiling {0} into {1}'.format(colliders, directory))
+        compile_map(colliders, directory, configs, timings)
+        return cls(directory)
+
+    def stale(self, colliders, configs=()):
+        """
+        Returns True if colliders changed since the bundle was built or a configuration is missing.
+        """
+        stat = os.stat(colliders)
+        if (stat.st_size, stat.st_mtime_ns) != (self._meta['source_size'], self._meta['source_mtime']):
+            return True
+        return any([float(a), float(s)] not in self._meta['configs'] for a, s in configs)
+
+    def _load(self, filename):
+        return np.load(os.path.join(self._directory, filename), mmap_mode='r')
+
+    @property
+    def home(self):
+        return self._meta['lat0'], self._meta['lon0']
+
+    @property
+    def offsets(self):
+        return self._meta['north_offset'], self._meta['east_offset']
+
+    @property
+    def colliders(self):
+        return self._load('colliders.npy')
+
+    def height_map(self, safety_distance):
+        """
+        Returns the height map with obstacles grown by safety_distance, for a
+        safety distance of one of the compiled configurations.
+        """
+        return self._load(_height_layer(safety_distance))
+
+    def grid(self, drone_altitude, safety_distance):
+        """
+        Returns the uint8 occupancy grid for the configuration.
+        """
+        return self._load(_layer('grid', drone_altitude, safety_distance))
+
+    def skeleton(self, drone_altitude, safety_distance):
+        """
+        Returns the medial-axis skeleton of the free space for the configuration.
+        """
+        return self._load(_layer('skeleton', drone_altitude, safety_distance))
+
+    def hierarchical_planner(self, drone_altitude, safety_distance, cluster_size=32):
+        """
+        Returns the `HierarchicalPlanner` of the configuration's grid, built on first use and cached in the bundle.
+        """
+        return HierarchicalPlanner.cached(self.grid(drone_altitude, safety_distance), os.path.join(
+            self._directory, _layer('hierarchical', drone_altitude, safety_distance, 'npz')), cluster_size=cluster_size)
+
+    def landmark_heuristic(self, drone_altitude, safety_distance, num_landmarks=8):
+        """
+        Returns the `LandmarkHeuristic` of the configuration's grid, built on first use and cached in the bundle.
+        """
+        return LandmarkHeuristic.cached(self.grid(drone_altitude, safety_distance), os.path.join(
+            self._directory, _layer('landmarks', drone_altitude, safety_distance, 'npz')), num_landmarks=num_landmarks)
+
+    def skeleton_graph(self, drone_altitude, safety_distance):
+        """
+        Returns the `SkeletonGraph` of the configuration's skeleton, built on first use and cached in the bundle.
+        """
+        skeleton = self.skeleton(drone_altitude, safety_distance)
+        return SkeletonGraph.cached(skeleton, os.path.join(
+            self._directory, _layer('skeleton_graph', drone_altitude, safety_distance, 'npz')))
+
+    def skeleton_index(self, drone_altitude, safety_distance):
+        """
+        Returns the `SkeletonIndex` of the configuration's skeleton, built once per bundle.
+        """
+        key = (float(drone_altitude), float(safety_distance))
+        if key not in self._indexes:
+            self._indexes[key] = SkeletonIndex(self.skeleton(drone_altitude, safety_distance))
+        return self._indexes[key]
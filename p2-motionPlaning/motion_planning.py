@@ -5,11 +5,12 @@ import utm
 from enum import Enum, auto
 
 import numpy as np
-from planning_utils import a_star, find_start_goal, collinearity, heading
-from grid import create_grid
+from collections import OrderedDict
+from planning_utils import ara_star, find_start_goal, collinearity, heading, SearchStats, timed, append_record
+from grid import OccupancyGrid
+from map_bundle import MapBundle
+from plan_cache import PlanCache
 
-from skimage.morphology import medial_axis
-from skimage.util import invert
 import numpy.linalg as LA
 from random import randrange, uniform
 
@@ -38,6 +39,9 @@ class MotionPlanning(Drone):
         self.waypoints = []
         self.in_mission = True
         self.check_state = {}
+        self.plan_cache = PlanCache('plan_cache')
+        # opened on the first plan and kept, so its skeleton index is built once per map
+        self.map_bundle = None
 
         # initial state
         self.flight_state = States.MANUAL
@@ -123,6 +127,12 @@ class MotionPlanning(Drone):
         print("Searching for a path ...")
         TARGET_ALTITUDE = 5
         SAFETY_DISTANCE = 5
+        # seconds the armed drone may spend planning before taking off on the best path so far
+        PLANNING_TIME = 5
+        deadline = time.time() + PLANNING_TIME
+        # wall time per planning phase, written to Logs/PlanStats.jsonl at the end
+        timings = OrderedDict()
+        search_stats = SearchStats()
 
         self.target_position[2] = TARGET_ALTITUDE
 
@@ -133,11 +143,14 @@ class MotionPlanning(Drone):
         # data_pos = np.loadtxt('colliders.csv',dtype='str', max_rows=1)
         # (lat0,lon0) = [float(data_pos[1][:-1]),float(data_pos[3][:-1])]
         
-        # for numpy vers <1.16 
-        with open('colliders.csv') as f:
-            latLonStrArr = f.readline().rstrip().replace('lat0','').replace('lon0 ','').split(',')
-            lat0 = float(latLonStrArr[0])
-            lon0 = float(latLonStrArr[1])
+        # the compiled map bundle is memory mapped and rebuilt whenever colliders.csv changes
+        with timed(timings, 'load_map'):
+            configs = [(TARGET_ALTITUDE, SAFETY_DISTANCE)]
+            if self.map_bundle is None or self.map_bundle.stale('colliders.csv', configs):
+                # a rebuild adds its phases (load_csv, create_grid, medial_axis, ...) to timings
+                self.map_bundle = MapBundle.open('colliders.csv', 'map_bundle', configs, timings)
+        bundle = self.map_bundle
+        lat0, lon0 = bundle.home
 
         # DONE: set home position to (lon0, lat0, 0)
         self.set_home_position(lon0, lat0, 0)
@@ -150,12 +163,9 @@ class MotionPlanning(Drone):
         
 
         # Read in obstacle map
-        data = np.loadtxt('colliders.csv', delimiter=',', dtype='Float64', skiprows=2)
-        
-        grid, north_offset, east_offset = create_grid(data, TARGET_ALTITUDE, SAFETY_DISTANCE)
+        grid = OccupancyGrid(bundle.grid(TARGET_ALTITUDE, SAFETY_DISTANCE))
+        north_offset, east_offset = bundle.offsets
         print("North offset = {0}, east offset = {1}".format(north_offset, east_offset))
-        
-        skeleton = medial_axis(invert(grid))
 
         # DONE: convert start position to current position rather than map center
         # Define starting point on the grid (this is just grid center)
@@ -176,15 +186,44 @@ class MotionPlanning(Drone):
         # local_goal to show expected transformation
         # goal_ne = global_to_local(global_goal, self.global_home)
         print("Drone is starting from {0} and the goal was randomly set to {1}".format(start_ne,goal_ne))
-        skel_start, skel_goal = find_start_goal(skeleton, start_ne, goal_ne)
-        
-        # Run A* to find a path from start to goal
-        # DONE: add diagonal motions with a cost of sqrt(2) to your A* implementation
-        # or move to a different search space such as a graph (not done here)
-        path_, cost = a_star(invert(skeleton).astype(np.int), tuple(skel_start), tuple(skel_goal))
+
+        # repeated routes on an unchanged map skip the search
+        cached = self.plan_cache.get('colliders.csv', TARGET_ALTITUDE, SAFETY_DISTANCE, start_ne, goal_ne)
+        if cached is not None:
+            print("Using cached path")
+            path_, cost = cached
+        else:
+            skeleton = bundle.skeleton(TARGET_ALTITUDE, SAFETY_DISTANCE)
+            with timed(timings, 'skeleton_graph'):
+                skeleton_graph = bundle.skeleton_graph(TARGET_ALTITUDE, SAFETY_DISTANCE)
+            with timed(timings, 'find_start_goal'):
+                # closest skeleton cells the drone can fly to in a straight line
+                skel_start, skel_goal = find_start_goal(skeleton, start_ne, goal_ne,
+                                                        index=bundle.skeleton_index(TARGET_ALTITUDE, SAFETY_DISTANCE),
+                                                        grid=grid.unpack())
+
+            # Run A* to find a path from start to goal
+            # DONE: add diagonal motions with a cost of sqrt(2) to your A* implementation
+            # or move to a different search space such as a graph
+            # the search runs over the junctions and endpoints of the skeleton, chains are its edges
+            with timed(timings, 'search'):
+                path_, cost = skeleton_graph.plan(skel_start, skel_goal, stats=search_stats)
+            if not path_:
+                # the skeleton does not join start and goal, fall back to anytime A* on the grid itself,
+                # which returns its best path so far at the deadline
+                with timed(timings, 'fallback_search'):
+                    path_, cost = ara_star(grid.unpack(), start_ne, goal_ne, deadline, stats=search_stats)
+            if path_:
+                self.plan_cache.put('colliders.csv', TARGET_ALTITUDE, SAFETY_DISTANCE, start_ne, goal_ne, path_, cost)
         print("Path length = {0}, path cost = {1}".format(len(path_), cost))
         # DONE: prune path to minimize number of waypoints
-        path = collinearity(path_)
+        with timed(timings, 'collinearity'):
+            path = collinearity(path_)
+        append_record('Logs/PlanStats.jsonl', {
+            'time': time.time(), 'start': start_ne, 'goal': goal_ne, 'cached': cached is not None,
+            'path_length': len(path_), 'path_cost': cost, 'waypoints': len(path),
+            'timings': timings, 'search': search_stats.as_dict()})
+        print("Planning timings: {0}".format(dict(timings)))
 
         # TODO (if you're feeling ambitious): Try a different approach altogether!
 
@@ -5,7 +5,7 @@ import utm
 from enum import Enum, auto
 from sampling import Sampler
 import numpy as np
-from grid import create_grid
+from map_bundle import MapBundle
 from planning_utils import a_star, heuristic
 from shapely.geometry import Polygon, Point, LineString
 import networkx as nx
@@ -149,8 +149,8 @@ class MotionPlanning(Drone):
             return g
 
         # TODO: read lat0, lon0 from colliders into floating point values
-        data_pos = np.loadtxt('colliders.csv',dtype='str', max_rows=1)
-        (lat0,lon0) = [float(data_pos[1][:-1]),float(data_pos[3][:-1])]
+        bundle = MapBundle.open('colliders.csv', 'map_bundle', [(TARGET_ALTITUDE, SAFETY_DISTANCE)])
+        (lat0,lon0) = bundle.home
         # TODO: set home position to (lon0, lat0, 0)
         (east_home, north_home,_,_) = utm.from_latlon(lat0, lon0)
 
@@ -161,7 +161,7 @@ class MotionPlanning(Drone):
         print('global home {0}, position {1}, local position {2}'.format(self.global_home, self.global_position,
                                                                          self.local_position))
         # Read in obstacle map
-        data = np.loadtxt('colliders.csv', delimiter=',', dtype='Float64', skiprows=2)
+        data = bundle.colliders
         
         # Sample points
         sampler = Sampler(data)
@@ -187,7 +187,8 @@ class MotionPlanning(Drone):
 
         
         # Define a grid for a particular altitude and safety margin around obstacles
-        grid, north_offset, east_offset = create_grid(data, TARGET_ALTITUDE, SAFETY_DISTANCE)
+        grid = bundle.grid(TARGET_ALTITUDE, SAFETY_DISTANCE)
+        north_offset, east_offset = bundle.offsets
         print("North offset = {0}, east offset = {1}".format(north_offset, east_offset))
         '''
         # Define starting point on the grid (this is just grid center)
@@ -0,0 +1,100 @@
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# bump whenever the planner or the stored path format changes, so older entries are not returned
+PLAN_CACHE_VERSION = 2
+
+_digests = {}
+
+
+def file_digest(filename):
+    """
+    Returns the sha1 hex digest of a file, memoized on its path, size and modification time.
+    """
+    stat = os.stat(filename)
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns)
+    if key not in _digests:
+        with open(filename, 'rb') as f:
+            _digests[key] = hashlib.sha1(f.read()).hexdigest()
+    return _digests[key]
+
+
+class PlanCache:
+    """
+    Cache of planned paths keyed by the collider file contents, altitude,
+    safety distance and the start/goal cells.
+
+    Recent plans are kept in an in-memory LRU of `maxsize` entries and every
+    plan is also written to `directory`, so repeated routes are answered
+    across process restarts. The directory is capped the same way at
+    `max_files` entries, dropping the least recently used files first. The key includes a hash of the collider file
+    and `PLAN_CACHE_VERSION`, so entries for an older map or planner are
+    never returned, and eventually pruned from disk.
+    """
+
+    def __init__(self, directory, maxsize=128, max_files=4096):
+        self._directory = directory
+        self._maxsize = maxsize
+        self._max_files = max_files
+        self._memory = OrderedDict()
+
+    def key(self, colliders, drone_altitude, safety_distance, start, goal):
+        fields = [PLAN_CACHE_VERSION, file_digest(colliders), float(drone_altitude), float(safety_distance)] + \
+            [int(v) for v in start] + [int(v) for v in goal]
+        return hashlib.sha1(repr(fields).encode()).hexdigest()
+
+    def _filename(self, key):
+        return os.path.join(self._directory, key + '.npz')
+
+    def _remember(self, key, plan):
+        self._memory[key] = plan
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._maxsize:
+            self._memory.popitem(last=False)
+
+    def get(self, colliders, drone_altitude, safety_distance, start, goal):
+        """
+        Returns the cached (path, cost) for the route or None.
+        """
+        key = self.key(colliders, drone_altitude, safety_distance, start, goal)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        filename = self._filename(key)
+        if not os.path.exists(filename):
+            return None
+        with np.load(filename) as f:
+            plan = [tuple(p) for p in f['path'].tolist()], float(f['cost'])
+        # the modification time doubles as the last use for pruning
+        os.utime(filename)
+        self._remember(key, plan)
+        return plan
+
+    def _prune(self):
+        """
+        Deletes the least recently used files beyond max_files.
+        """
+        entries = [e for e in os.scandir(self._directory) if e.name.endswith('.npz')]
+        if len(entries) <= self._max_files:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime_ns)
+        for entry in entries[:len(entries) - self._max_files]:
+            os.remove(entry.path)
+
+    def put(self, colliders, drone_altitude, safety_distance, start, goal, path, cost):
+        """
+        Stores the (path, cost) for the route in memory and on disk.
+        """
+        key = self.key(colliders, drone_altitude, safety_distance, start, goal)
+        plan = [tuple(int(v) for v in p) for p in path], float(cost)
+        self._remember(key, plan)
+        os.makedirs(self._directory, exist_ok=True)
+        # write to a temporary file first so a crash never leaves a truncated entry
+        filename = self._filename(key)
+        with open(filename + '.tmp', 'wb') as f:
+            np.savez(f, path=np.array(plan[0], dtype=np.int32).reshape(-1, 2), cost=plan[1])
+        os.replace(filename + '.tmp', filename)
+        self._prune()
@@ -1,10 +1,17 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
 from enum import Enum
-from queue import PriorityQueue
 import numpy as np
 import pkg_resources
 pkg_resources.require("networkx==2.1")
 import networkx as nx
 import numpy.linalg as LA
+from scipy.spatial import cKDTree
 
 # Assume all actions cost the same.
 class Action(Enum):
@@ -66,69 +73,914 @@ def valid_actions(grid, current_node):
     return valid_actions
 
 
-def a_star(grid, start, goal):
+def neighbor_mask(grid, corners=True):
+    """
+    Returns a uint8 array with one bit per action (in `Action` order) set
+    for every move that is valid from the corresponding grid cell.
+
+    Straight moves need a free target cell. Diagonal moves need a free
+    target cell and at least one free orthogonal neighbour, i.e. the drone
+    may cut a corner but not squeeze between two obstacles. With corners
+    False diagonal moves only need a free target cell, which is what a
+    one pixel wide medial-axis skeleton needs to stay connected.
+    """
+    free = np.pad(np.asarray(grid) != 1, 1, mode='constant', constant_values=False)
+    west = free[1:-1, :-2]
+    east = free[1:-1, 2:]
+    north = free[:-2, 1:-1]
+    south = free[2:, 1:-1]
+    moves = [west, east, north, south, free[:-2, :-2], free[2:, :-2], free[:-2, 2:], free[2:, 2:]]
+    if corners:
+        moves[4:] = [moves[4] & (north | west), moves[5] & (south | west),
+                     moves[6] & (north | east), moves[7] & (south | east)]
+    mask = np.zeros((free.shape[0] - 2, free.shape[1] - 2), dtype=np.uint8)
+    for bit, move in enumerate(moves):
+        mask |= move.astype(np.uint8) << bit
+    return mask
+
+
+def grid_digest(grid):
+    """
+    Returns a hex digest of the occupancy of a grid, independent of its dtype.
+    """
+    occupied = np.ascontiguousarray(np.asarray(grid) == 1)
+    return hashlib.sha1(str(occupied.shape).encode() + np.packbits(occupied).tobytes()).hexdigest()
+
+
+# Successor table indexed by a neighbor mask: (dx, dy, cost) for every set bit.
+_SUCCESSORS = tuple(
+    tuple((a.value[0], a.value[1], float(a.cost)) for bit, a in enumerate(Action) if m >> bit & 1)
+    for m in range(256))
+
+
+class SearchStats:
+    """
+    Counters and timings of a single search, filled in by the planners that take a `stats` argument.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.pushed = 0
+        self.peak_open = 0
+        self.heuristic_calls = 0
+        self.expansion_time = 0.0
+        self.reconstruction_time = 0.0
+
+    def record(self, expanded, pushed, peak_open, search_start, reconstruction_start):
+        """
+        Fills in the counters of a finished search. search_start and
+        reconstruction_start are `time.perf_counter()` values taken when the
+        search and the path reconstruction began; every pushed node counts as
+        one heuristic call.
+        """
+        self.expanded = expanded
+        self.pushed = self.heuristic_calls = pushed
+        self.peak_open = peak_open
+        self.expansion_time = reconstruction_start - search_start
+        self.reconstruction_time = time.perf_counter() - reconstruction_start
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+@contextmanager
+def timed(timings, name):
+    """
+    Adds the wall time spent in the with-block to timings[name].
+    """
+    start = time.perf_counter()
+    yield
+    timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+def append_record(filename, record):
+    """
+    Appends record as one JSON line to filename, creating the directory if needed.
+    """
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, 'a') as f:
+        # NumPy scalars and arrays are written as plain numbers and lists
+        f.write(json.dumps(record, default=lambda o: o.tolist()) + '\n')
+
+
+SQRT2_MINUS_1 = math.sqrt(2) - 1
+
+
+def octile(n1, n2):
+    """
+    Octile distance between two grid cells, exact on an open 8-connected grid.
+    """
+    dx = abs(n1[0] - n2[0])
+    dy = abs(n1[1] - n2[1])
+    return max(dx, dy) + SQRT2_MINUS_1 * min(dx, dy)
+
+
+def euclidean(n1, n2):
+    """
+    Straight line distance between two grid cells.
+    """
+    return math.hypot(n1[0] - n2[0], n1[1] - n2[1])
+
+
+def heuristic_field(shape, goal, kind='octile'):
+    """
+    Returns a float32 array holding the octile or euclidean distance from every cell to goal.
+    """
+    dx = np.abs(np.arange(shape[0], dtype=np.float32) - goal[0])[:, None]
+    dy = np.abs(np.arange(shape[1], dtype=np.float32) - goal[1])[None, :]
+    if kind == 'octile':
+        return np.maximum(dx, dy) + np.float32(SQRT2_MINUS_1) * np.minimum(dx, dy)
+    if kind == 'euclidean':
+        return np.hypot(dx, dy)
+    raise ValueError('Unknown heuristic kind: {0}'.format(kind))
+
+
+def _estimator(h, goal):
+    """
+    Returns a one-argument cost-to-goal function for a heuristic function or field.
+    """
+    if h is None:
+        h = octile
+    if isinstance(h, np.ndarray):
+        return lambda node: float(h[node])
+    return lambda node: h(node, goal)
+
+
+def a_star(grid, start, goal, mask=None, h=None, stats=None):
+    """
+    Returns the cheapest path from start to goal on the grid together with its cost.
+
+    Successors are read from a neighbor mask (see `neighbor_mask`), which is
+    computed from the grid if not given. Pass a precomputed mask to reuse it
+    across searches on the same grid.
+
+    `h` is either a function `h(node, goal)` such as `octile` (the default) or
+    `euclidean`, or a distance-to-goal array from `heuristic_field`.
+
+    The open list is a binary heap with lazy deletion: a node may be pushed several
+    times while its cost is being relaxed and stale entries are skipped when popped.
+    Nodes are closed once expanded, so every node is expanded at most once.
+
+    Pass a `SearchStats` as stats to collect counters and timings.
+    """
+    search_start = time.perf_counter()
+    if mask is None:
+        mask = neighbor_mask(grid)
+    estimate = _estimator(h, goal)
 
     path = []
     path_cost = 0
-    queue = PriorityQueue()
-    queue.put((0, start))
-    visited = set(start)
+    queue = [(estimate(start), start)]
+    g_cost = {start: 0.0}
+    closed = set()
+    pushed = peak_open = 1
 
     branch = {}
     found = False
-    
-    while not queue.empty():
-        item = queue.get()
-        current_node = item[1]
-        if current_node == start:
-            current_cost = 0.0
-        else:              
-            current_cost = branch[current_node][0]
-            
-        if current_node == goal:        
+
+    while queue:
+        _, current_node = heapq.heappop(queue)
+        if current_node in closed:
+            continue
+        closed.add(current_node)
+
+        if current_node == goal:
             print('Found a path.')
             found = True
             break
-        else:
-            for action in valid_actions(grid, current_node):
-                # get the tuple representation
-                da = action.delta
-                next_node = (current_node[0] + da[0], current_node[1] + da[1])
-                branch_cost = current_cost + action.cost
-                queue_cost = branch_cost + heuristic(next_node, goal)
-                
-                if next_node not in visited:                
-                    visited.add(next_node)               
-                    branch[next_node] = (branch_cost, current_node, action)
-                    queue.put((queue_cost, next_node))
-             
+
+        current_cost = g_cost[current_node]
+        x, y = current_node
+        for dx, dy, cost in _SUCCESSORS[mask[x, y]]:
+            next_node = (x + dx, y + dy)
+            if next_node in closed:
+                continue
+            branch_cost = current_cost + cost
+            if branch_cost < g_cost.get(next_node, np.inf):
+                g_cost[next_node] = branch_cost
+                branch[next_node] = (branch_cost, current_node)
+                heapq.heappush(queue, (branch_cost + estimate(next_node), next_node))
+                pushed += 1
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    reconstruction_start = time.perf_counter()
     if found:
         # retrace steps
         n = goal
-        path_cost = branch[n][0]
+        path_cost = g_cost[goal]
         path.append(goal)
-        while branch[n][1] != start:
-            path.append(branch[n][1])
+        while n != start:
             n = branch[n][1]
-        path.append(branch[n][1])
+            path.append(n)
     else:
         print('**********************')
         print('Failed to find a path!')
-        print('**********************') 
+        print('**********************')
+    if stats is not None:
+        stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
     return path[::-1], path_cost
 
 
+def a_star_flat(grid, start, goal, mask=None, h=None, stats=None):
+    """
+    Array-backed variant of `a_star` with the same arguments and return value.
+
+    Nodes are flat indices into the grid. The g-costs and parents live in
+    preallocated float32/int32 arrays of `grid.size` elements instead of
+    dictionaries keyed by tuples, which keeps peak memory and garbage
+    collection pressure flat when many searches run back to back.
+    """
+    search_start = time.perf_counter()
+    if mask is None:
+        mask = neighbor_mask(grid)
+    rows, cols = mask.shape
+    flat_mask = mask.ravel()
+    # (index offset, cost) for every move of every mask value
+    successors = [tuple((dx * cols + dy, cost) for dx, dy, cost in moves) for moves in _SUCCESSORS]
+
+    start_index = start[0] * cols + start[1]
+    goal_index = goal[0] * cols + goal[1]
+    if isinstance(h, np.ndarray):
+        field = h.ravel()
+        estimate = lambda index: float(field[index])
+    else:
+        estimate_node = _estimator(h, goal)
+        estimate = lambda index: estimate_node(divmod(index, cols))
+
+    g_cost = np.full(rows * cols, np.inf, dtype=np.float32)
+    parent = np.full(rows * cols, -1, dtype=np.int32)
+    closed = np.zeros(rows * cols, dtype=bool)
+    g_cost[start_index] = 0.0
+    queue = [(estimate(start_index), start_index)]
+    found = False
+    expanded = 0
+    pushed = peak_open = 1
+
+    while queue:
+        _, current = heapq.heappop(queue)
+        if closed[current]:
+            continue
+        closed[current] = True
+        expanded += 1
+
+        if current == goal_index:
+            print('Found a path.')
+            found = True
+            break
+
+        current_cost = float(g_cost[current])
+        for offset, cost in successors[flat_mask[current]]:
+            next_index = current + offset
+            if closed[next_index]:
+                continue
+            branch_cost = current_cost + cost
+            if branch_cost < g_cost[next_index]:
+                g_cost[next_index] = branch_cost
+                parent[next_index] = current
+                heapq.heappush(queue, (branch_cost + estimate(next_index), next_index))
+                pushed += 1
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    reconstruction_start = time.perf_counter()
+    if found:
+        path, path_cost = _retrace(parent, start_index, goal_index, mask.shape), float(g_cost[goal_index])
+    else:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+        path, path_cost = [], 0
+    if stats is not None:
+        stats.record(expanded, pushed, peak_open, search_start, reconstruction_start)
+    return path, path_cost
+
+
+def _retrace(parent, start_index, goal_index, shape):
+    """
+    Walks a flat parent array back from goal_index and returns the grid path from start.
+    """
+    indices = [goal_index]
+    while indices[-1] != start_index:
+        indices.append(parent[indices[-1]])
+    rows, cols = np.unravel_index(np.array(indices[::-1]), shape)
+    return list(zip(rows.tolist(), cols.tolist()))
+
+
+def ara_star(grid, start, goal, deadline, mask=None, h=None, epsilon=3.0, epsilon_step=0.5, stats=None):
+    """
+    Anytime Repairing A* (ARA*): returns the best path found before deadline.
+
+    A first path is found with the heuristic inflated by epsilon, which is
+    quick but may be up to epsilon times longer than optimal. While time is
+    left, epsilon is lowered by epsilon_step and the search is repaired,
+    reusing the work of the previous pass, until it reaches 1 (optimal).
+
+    deadline is a `time.time()` value. Every pass stops there, the first one
+    too, so a goal that is unreachable or too far returns no path on time.
+
+    Pass a `SearchStats` as stats to collect counters and timings summed over all passes.
+    """
+    search_start = time.perf_counter()
+    if mask is None:
+        mask = neighbor_mask(grid)
+    estimate = _estimator(h, goal)
+    counts = SearchStats() if stats is None else stats
+    counts.expanded = 0
+    counts.pushed = counts.heuristic_calls = counts.peak_open = 1
+    reconstruction_time = 0.0
+
+    g_cost = {start: 0.0}
+    branch = {start: None}
+    open_set = {start}
+    closed = set()
+    incons = set()
+    queue = [(epsilon * estimate(start), 0.0, start)]
+    best_path, best_cost = [], np.inf
+
+    def improve_path():
+        # returns False if the deadline interrupted the pass
+        expansions = 0
+        while queue:
+            key, pushed_cost, current_node = queue[0]
+            if current_node not in open_set or pushed_cost != g_cost[current_node]:
+                heapq.heappop(queue)
+                continue
+            if g_cost.get(goal, np.inf) <= key:
+                return True
+            expansions += 1
+            if expansions % 256 == 0 and time.time() > deadline:
+                return False
+            heapq.heappop(queue)
+            open_set.discard(current_node)
+            closed.add(current_node)
+            counts.expanded += 1
+
+            current_cost = g_cost[current_node]
+            x, y = current_node
+            for dx, dy, cost in _SUCCESSORS[mask[x, y]]:
+                next_node = (x + dx, y + dy)
+                branch_cost = current_cost + cost
+                if branch_cost < g_cost.get(next_node, np.inf):
+                    g_cost[next_node] = branch_cost
+                    branch[next_node] = current_node
+                    if next_node in closed:
+                        incons.add(next_node)
+                    else:
+                        open_set.add(next_node)
+                        heapq.heappush(queue, (branch_cost + epsilon * estimate(next_node), branch_cost, next_node))
+                        counts.pushed += 1
+                        counts.heuristic_calls += 1
+            if len(queue) > counts.peak_open:
+                counts.peak_open = len(queue)
+        return True
+
+    while True:
+        completed = improve_path()
+        if goal in g_cost and g_cost[goal] < best_cost:
+            reconstruction_start = time.perf_counter()
+            best_path = [goal]
+            while branch[best_path[-1]] is not None:
+                best_path.append(branch[best_path[-1]])
+            best_path.reverse()
+            best_cost = g_cost[goal]
+            reconstruction_time += time.perf_counter() - reconstruction_start
+            print('Found a path with epsilon = {0}.'.format(epsilon))
+        if not completed or epsilon <= 1.0 or time.time() > deadline or not best_path:
+            break
+
+        epsilon = max(1.0, epsilon - epsilon_step)
+        open_set |= incons
+        incons = set()
+        closed = set()
+        queue[:] = [(g_cost[n] + epsilon * estimate(n), g_cost[n], n) for n in open_set]
+        heapq.heapify(queue)
+        counts.pushed += len(queue)
+        counts.heuristic_calls += len(queue)
+
+    counts.reconstruction_time = reconstruction_time
+    counts.expansion_time = time.perf_counter() - search_start - reconstruction_time
+    if not best_path:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+        return [], 0
+    # parents may have improved after goal was last updated, so measure the path itself
+    return best_path, sum(euclidean(a, b) for a, b in zip(best_path[:-1], best_path[1:]))
+
+
+def distance_field(grid, source, mask=None, reverse=False):
+    """
+    Runs Dijkstra from source until every reachable cell is settled.
+
+    Returns a float32 cost array shaped like the grid (inf where unreachable)
+    and a flat int32 parent array. Paths to any number of goals can then be
+    read with `field_path` without searching again.
+
+    With reverse=True, source is a shared goal and the costs are cost-to-go:
+    the search follows moves backwards and each parent entry holds the next
+    cell on the way to source.
+    """
+    if mask is None:
+        mask = neighbor_mask(grid)
+    rows, cols = mask.shape
+    flat_mask = mask.ravel()
+    cost = np.full(rows * cols, np.inf, dtype=np.float32)
+    parent = np.full(rows * cols, -1, dtype=np.int32)
+    closed = np.zeros(rows * cols, dtype=bool)
+    moves = [(bit, a.delta[0], a.delta[1], float(a.cost)) for bit, a in enumerate(Action)]
+
+    source_index = source[0] * cols + source[1]
+    cost[source_index] = 0.0
+    queue = [(0.0, source_index)]
+    while queue:
+        current_cost, current = heapq.heappop(queue)
+        if closed[current]:
+            continue
+        closed[current] = True
+        x, y = divmod(current, cols)
+        if reverse:
+            # cells from which a valid move leads into the current cell
+            neighbors = []
+            for bit, dx, dy, step in moves:
+                px, py = x - dx, y - dy
+                if 0 <= px < rows and 0 <= py < cols and flat_mask[px * cols + py] >> bit & 1:
+                    neighbors.append((px * cols + py, step))
+        else:
+            neighbors = [((x + dx) * cols + y + dy, step) for dx, dy, step in _SUCCESSORS[flat_mask[current]]]
+        for next_index, step in neighbors:
+            if closed[next_index]:
+                continue
+            branch_cost = current_cost + step
+            if branch_cost < cost[next_index]:
+                cost[next_index] = branch_cost
+                parent[next_index] = current
+                heapq.heappush(queue, (branch_cost, next_index))
+    return cost.reshape(rows, cols), parent
+
+
+def field_path(cost, parent, node, reverse=False):
+    """
+    Returns the path and its cost for node from the output of `distance_field`.
+
+    For a forward field the path runs from the field's source to node, for a
+    reverse field it runs from node to the shared goal.
+    """
+    node = tuple(node)
+    if not np.isfinite(cost[node]):
+        return [], 0
+    cols = cost.shape[1]
+    indices = [node[0] * cols + node[1]]
+    while parent[indices[-1]] != -1:
+        indices.append(parent[indices[-1]])
+    if not reverse:
+        indices.reverse()
+    rows, cols = np.unravel_index(np.array(indices), cost.shape)
+    return list(zip(rows.tolist(), cols.tolist())), float(cost[node])
+
+
+def bidirectional_a_star(grid, start, goal, mask=None, h=None, stats=None):
+    """
+    Bidirectional A*: searches forward from start and backward from goal at
+    the same time and returns the path and its cost, like `a_star`.
+
+    Each side keeps the full heuristic towards its own target (`h(node, goal)`
+    forward, `h(node, start)` backward), and the side with the smaller open
+    list is expanded next. Every path cheaper than the best meeting point
+    found so far has a node open on both sides with an f-value below its
+    cost. So the search stops, with an optimal path, as soon as either
+    side's smallest f-value reaches that cost. Nodes whose f-value already
+    reaches it are not queued at all.
+
+    With the octile heuristic on open city maps this usually expands a
+    little more than `a_star`, and on some queries several times more. It
+    pays off when one endpoint is enclosed: the smaller frontier is
+    exhausted first, so an unreachable goal in a courtyard fails after a
+    thousand expansions instead of flooding the whole map.
+
+    `h` must be a heuristic function such as `octile` (the default); a
+    heuristic field only covers one direction. Pass a `SearchStats` as stats
+    to collect counters and timings.
+    """
+    search_start = time.perf_counter()
+    if isinstance(h, np.ndarray):
+        raise ValueError('bidirectional_a_star needs a heuristic function, not a field')
+    if mask is None:
+        mask = neighbor_mask(grid)
+    estimates = (_estimator(h, goal), _estimator(h, start))
+
+    queues = ([(estimates[0](start), start)], [(estimates[1](goal), goal)])
+    g_costs = ({start: 0.0}, {goal: 0.0})
+    parents = ({start: None}, {goal: None})
+    closed = (set(), set())
+    best_cost = 0.0 if start == goal else np.inf
+    meeting = start if start == goal else None
+    pushed = peak_open = 2
+
+    while True:
+        for side in (0, 1):
+            while queues[side] and queues[side][0][1] in closed[side]:
+                heapq.heappop(queues[side])
+        if not queues[0] or not queues[1]:
+            break
+        if max(queues[0][0][0], queues[1][0][0]) >= best_cost:
+            break
+
+        # expand the smaller frontier; the reverse search walks the same
+        # moves backwards, which is valid since free-cell moves are symmetric
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        queue, g_cost, parent, estimate = queues[side], g_costs[side], parents[side], estimates[side]
+        other_g_cost = g_costs[1 - side]
+
+        _, current_node = heapq.heappop(queue)
+        closed[side].add(current_node)
+        current_cost = g_cost[current_node]
+        x, y = current_node
+        for dx, dy, cost in _SUCCESSORS[mask[x, y]]:
+            next_node = (x + dx, y + dy)
+            if next_node in closed[side]:
+                continue
+            branch_cost = current_cost + cost
+            if branch_cost < g_cost.get(next_node, np.inf):
+                g_cost[next_node] = branch_cost
+                parent[next_node] = current_node
+                if next_node in other_g_cost and branch_cost + other_g_cost[next_node] < best_cost:
+                    best_cost = branch_cost + other_g_cost[next_node]
+                    meeting = next_node
+                f = branch_cost + estimate(next_node)
+                if f < best_cost:
+                    heapq.heappush(queue, (f, next_node))
+                    pushed += 1
+        if len(queues[0]) + len(queues[1]) > peak_open:
+            peak_open = len(queues[0]) + len(queues[1])
+
+    reconstruction_start = time.perf_counter()
+    path = []
+    if meeting is None:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+        best_cost = 0
+    else:
+        print('Found a path.')
+        path = [meeting]
+        while parents[0][path[-1]] is not None:
+            path.append(parents[0][path[-1]])
+        path.reverse()
+        while parents[1][path[-1]] is not None:
+            path.append(parents[1][path[-1]])
+    if stats is not None:
+        stats.record(len(closed[0]) + len(closed[1]), pushed, peak_open, search_start, reconstruction_start)
+    return path, best_cost
+
+
+def jump_point_search(grid, start, goal, h=None, stats=None):
+    """
+    Jump Point Search over the same 8-connected move set as `a_star`.
+
+    Straight and diagonal runs are scanned without pushing the intermediate
+    cells; only jump points (cells with forced neighbours, or the goal) enter
+    the open list. The corner-cutting rule of `neighbor_mask` is kept: a
+    diagonal step needs at least one free orthogonal neighbour.
+
+    Returns the full cell-by-cell path and its cost, like `a_star`. Pass a
+    `SearchStats` as stats to collect counters and timings; only jump points
+    count as pushed and expanded.
+    """
+    search_start = time.perf_counter()
+    rows, cols = np.shape(grid)
+    width = cols + 2
+    # padded, flattened free-space bytes; the border keeps every scan on the grid
+    cells = np.pad(np.asarray(grid) != 1, 1, mode='constant', constant_values=False).tobytes()
+
+    def to_index(node):
+        return (node[0] + 1) * width + node[1] + 1
+
+    def to_node(index):
+        row, col = divmod(index, width)
+        return row - 1, col - 1
+
+    start_index = to_index(start)
+    goal_index = to_index(goal)
+    estimate_node = _estimator(h, goal)
+
+    def jump_straight(index, step, side):
+        while True:
+            index += step
+            if not cells[index]:
+                return None
+            if index == goal_index:
+                return index
+            if (cells[index + step + side] and not cells[index + side]) or \
+                    (cells[index + step - side] and not cells[index - side]):
+                return index
+
+    def jump(index, dx, dy):
+        if dx == 0:
+            return jump_straight(index, dy, width)
+        if dy == 0:
+            return jump_straight(index, dx * width, 1)
+        step_x = dx * width
+        while True:
+            if not (cells[index + step_x] or cells[index + dy]):
+                return None
+            index += step_x + dy
+            if not cells[index]:
+                return None
+            if index == goal_index:
+                return index
+            if (cells[index - step_x + dy] and not cells[index - step_x]) or \
+                    (cells[index + step_x - dy] and not cells[index - dy]):
+                return index
+            if jump_straight(index, step_x, 1) is not None or jump_straight(index, dy, width) is not None:
+                return index
+
+    def directions(index, parent_index):
+        if parent_index is None:
+            return [a.delta for a in Action]
+        row, col = divmod(index, width)
+        parent_row, parent_col = divmod(parent_index, width)
+        dx = (row > parent_row) - (row < parent_row)
+        dy = (col > parent_col) - (col < parent_col)
+        step_x = dx * width
+        pruned = []
+        if dx and dy:
+            free_x = cells[index + step_x]
+            free_y = cells[index + dy]
+            if free_y:
+                pruned.append((0, dy))
+            if free_x:
+                pruned.append((dx, 0))
+            if free_x or free_y:
+                pruned.append((dx, dy))
+            if free_y and not cells[index - step_x]:
+                pruned.append((-dx, dy))
+            if free_x and not cells[index - dy]:
+                pruned.append((dx, -dy))
+        elif dx:
+            if cells[index + step_x]:
+                pruned.append((dx, 0))
+                for side in (1, -1):
+                    if not cells[index + side]:
+                        pruned.append((dx, side))
+        else:
+            if cells[index + dy]:
+                pruned.append((0, dy))
+                for side in (1, -1):
+                    if not cells[index + side * width]:
+                        pruned.append((side, dy))
+        return pruned
+
+    queue = [(estimate_node(start), start_index)]
+    g_cost = {start_index: 0.0}
+    branch = {start_index: None}
+    closed = set()
+    found = False
+    pushed = peak_open = 1
+
+    while queue:
+        _, current = heapq.heappop(queue)
+        if current in closed:
+            continue
+        closed.add(current)
+
+        if current == goal_index:
+            print('Found a path.')
+            found = True
+            break
+
+        current_node = to_node(current)
+        for dx, dy in directions(current, branch[current]):
+            jump_index = jump(current, dx, dy)
+            if jump_index is None or jump_index in closed:
+                continue
+            jump_node = to_node(jump_index)
+            branch_cost = g_cost[current] + octile(current_node, jump_node)
+            if branch_cost < g_cost.get(jump_index, np.inf):
+                g_cost[jump_index] = branch_cost
+                branch[jump_index] = current
+                heapq.heappush(queue, (branch_cost + estimate_node(jump_node), jump_index))
+                pushed += 1
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    reconstruction_start = time.perf_counter()
+    if not found:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+        if stats is not None:
+            stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+        return [], 0
+
+    jump_points = [goal_index]
+    while branch[jump_points[-1]] is not None:
+        jump_points.append(branch[jump_points[-1]])
+    jump_points = [to_node(index) for index in reversed(jump_points)]
+
+    # fill in the straight and diagonal runs between consecutive jump points
+    path = [jump_points[0]]
+    for (x1, y1), (x2, y2) in zip(jump_points[:-1], jump_points[1:]):
+        dx = (x2 > x1) - (x2 < x1)
+        dy = (y2 > y1) - (y2 < y1)
+        for i in range(1, max(abs(x2 - x1), abs(y2 - y1)) + 1):
+            path.append((x1 + i * dx, y1 + i * dy))
+    if stats is not None:
+        stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+    return path, g_cost[goal_index]
+
+
+# segments with more steps than this are checked with NumPy in one go
+LINE_OF_SIGHT_VECTORIZE = 64
+
+
+def flat_cells(grid):
+    """
+    Returns the grid as bytes with one 0 (free) or 1 (obstacle) per cell in
+    row-major order, for fast repeated `line_of_sight` checks.
+    """
+    return np.ascontiguousarray(np.asarray(grid) == 1).tobytes()
+
+
+def line_of_sight(grid, p1, p2, flat=None):
+    """
+    Returns True if the straight line from p1 to p2 only crosses free cells.
+
+    The cells on the line are the ones Bresenham's algorithm visits, rounded
+    with exact integer arithmetic. Diagonal steps along the line follow the
+    corner rule of `neighbor_mask`: at least one of the two cells beside the
+    step must be free.
+
+    Short segments are walked cell by cell and stop at the first blocked
+    cell. Long ones are computed at once with NumPy, which has a fixed cost
+    per call that only pays off there. Pass `flat_cells(grid)` as flat when
+    checking many segments on the same grid, so the walk reads plain bytes.
+    """
+    x0, y0 = int(p1[0]), int(p1[1])
+    dx, dy = int(p2[0]) - x0, int(p2[1]) - y0
+    steps = max(abs(dx), abs(dy))
+    if steps > LINE_OF_SIGHT_VECTORIZE:
+        t = np.arange(steps + 1)
+        x = x0 + (2 * t * dx + steps) // (2 * steps)
+        y = y0 + (2 * t * dy + steps) // (2 * steps)
+        if np.any(grid[x, y] == 1):
+            return False
+        diagonal = (x[1:] != x[:-1]) & (y[1:] != y[:-1])
+        corners_blocked = (grid[x[1:], y[:-1]] == 1) & (grid[x[:-1], y[1:]] == 1)
+        return not np.any(diagonal & corners_blocked)
+
+    if flat is None:
+        flat = np.asarray(grid).ravel()
+    cols = np.shape(grid)[1]
+    if flat[x0 * cols + y0] == 1:
+        return False
+    px, py = x0, y0
+    for t in range(1, steps + 1):
+        x = x0 + (2 * t * dx + steps) // (2 * steps)
+        y = y0 + (2 * t * dy + steps) // (2 * steps)
+        if flat[x * cols + y] == 1:
+            return False
+        if x != px and y != py and flat[x * cols + py] == 1 and flat[px * cols + y] == 1:
+            return False
+        px, py = x, y
+    return True
+
+
+def theta_star(grid, start, goal, mask=None, stats=None):
+    """
+    Any-angle path planning with Lazy Theta*.
+
+    Like A*, but a successor may take the parent of the expanded node as its
+    own parent, so path segments are not tied to the 8 grid directions. Line
+    of sight is only checked when a node is expanded, which is when its
+    tentative parent is confirmed or replaced by the best expanded neighbour.
+
+    Returns the waypoints of the path (its corners only) and the path length.
+    Pass a `SearchStats` as stats to collect counters and timings.
+    """
+    search_start = time.perf_counter()
+    if mask is None:
+        mask = neighbor_mask(grid)
+    flat = flat_cells(grid)
+
+    g_cost = {start: 0.0}
+    parent = {start: start}
+    closed = set()
+    queue = [(euclidean(start, goal), start)]
+    found = False
+    pushed = peak_open = 1
+
+    while queue:
+        _, current_node = heapq.heappop(queue)
+        if current_node in closed:
+            continue
+        x, y = current_node
+        if not line_of_sight(grid, parent[current_node], current_node, flat):
+            # the assumed parent is not visible: fall back to the best expanded neighbour
+            g_cost[current_node], parent[current_node] = min(
+                (g_cost[(x + dx, y + dy)] + cost, (x + dx, y + dy))
+                for dx, dy, cost in _SUCCESSORS[mask[x, y]] if (x + dx, y + dy) in closed)
+        closed.add(current_node)
+
+        if current_node == goal:
+            print('Found a path.')
+            found = True
+            break
+
+        grandparent = parent[current_node]
+        for dx, dy, _ in _SUCCESSORS[mask[x, y]]:
+            next_node = (x + dx, y + dy)
+            if next_node in closed:
+                continue
+            branch_cost = g_cost[grandparent] + euclidean(grandparent, next_node)
+            if branch_cost < g_cost.get(next_node, np.inf):
+                g_cost[next_node] = branch_cost
+                parent[next_node] = grandparent
+                heapq.heappush(queue, (branch_cost + euclidean(next_node, goal), next_node))
+                pushed += 1
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    reconstruction_start = time.perf_counter()
+    path, path_cost = [], 0
+    if found:
+        path = [goal]
+        while path[-1] != start:
+            path.append(parent[path[-1]])
+        path, path_cost = path[::-1], g_cost[goal]
+    else:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+    if stats is not None:
+        stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+    return path, path_cost
+
+
 def h(position, goal_position):
     return np.linalg.norm(np.array(position) - np.array(goal_position))
 
 
-def find_start_goal(skel, start, goal):
-    skel_cells = np.transpose(skel.nonzero())
-    start_min_dist = np.linalg.norm(np.array(start) - np.array(skel_cells), axis=1).argmin()
-    near_start = skel_cells[start_min_dist]
-    goal_min_dist = np.linalg.norm(np.array(goal) - np.array(skel_cells), axis=1).argmin()
-    near_goal = skel_cells[goal_min_dist]
-    
+class SkeletonIndex:
+    """
+    Nearest-neighbour index over the cells of a skeleton, built once with a
+    k-d tree and reused for every start and goal on that skeleton.
+    """
+
+    def __init__(self, skeleton):
+        self._cells = np.argwhere(skeleton)
+        if not len(self._cells):
+            raise ValueError('the skeleton has no cells to index')
+        self._tree = cKDTree(self._cells)
+
+    @property
+    def cells(self):
+        return self._cells
+
+    def nearest(self, points, k=1):
+        """
+        Returns the nearest skeleton cell of a point, or of every point in an
+        (N, 2) array. With k > 1 the k nearest cells are returned, closest
+        first, at most as many as the skeleton has.
+        """
+        points = np.asarray(points, dtype=float)
+        k = min(k, len(self._cells))
+        _, idxs = self._tree.query(points.reshape(-1, 2), k)
+        cells = self._cells[idxs]
+        return cells.reshape(points.shape[:-1] + cells.shape[1:])
+
+    def reachable(self, points, grid, k=8):
+        """
+        Returns for every point the closest of its k nearest skeleton cells
+        that is in line of sight on grid, or the nearest cell if none is.
+        """
+        points = np.asarray(points, dtype=int).reshape(-1, 2)
+        candidates = self.nearest(points, k).reshape(len(points), -1, 2)
+        cells = candidates[:, 0].copy()
+        for i, (point, options) in enumerate(zip(points, candidates)):
+            for cell in options:
+                if line_of_sight(grid, tuple(point), tuple(cell)):
+                    cells[i] = cell
+                    break
+        return cells
+
+
+def find_start_goal(skel, start, goal, index=None, grid=None, k=8):
+    """
+    Returns the skeleton cells closest to start and goal.
+
+    Pass the `SkeletonIndex` of skel as index to reuse it across calls. With
+    an occupancy grid, the closest of the k nearest cells that can be reached
+    in a straight line is picked instead.
+    """
+    if index is None:
+        index = SkeletonIndex(skel)
+    if grid is None:
+        near_start, near_goal = index.nearest([start, goal])
+    else:
+        near_start, near_goal = index.reachable([start, goal], grid, k)
     return near_start, near_goal
 
 
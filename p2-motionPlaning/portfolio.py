@@ -0,0 +1,135 @@
+import hashlib
+import time
+from multiprocessing import Pool
+
+import networkx as nx
+import numpy as np
+from numpy import linalg as LA
+from skimage.morphology import medial_axis
+from skimage.util import invert
+from sklearn.neighbors import KDTree
+
+from planning_utils import a_star_flat, append_record, ara_star, find_start_goal, line_of_sight, neighbor_mask
+
+
+def path_length(path):
+    """
+    Returns the Euclidean length of a path given as a list of cells.
+    """
+    if len(path) < 2:
+        return 0.0
+    return float(LA.norm(np.diff(np.array(path, dtype=float), axis=0), axis=1).sum())
+
+
+def grid_planner(grid, start, goal, deadline):
+    """
+    A* over every free cell of the grid.
+    """
+    path, _ = a_star_flat(grid, start, goal)
+    return path
+
+
+def skeleton_planner(grid, start, goal, deadline):
+    """
+    ARA* along the medial axis of the free space, as in motion_planning.py,
+    with the legs from start and to goal added to the path. Returns no path
+    if either leg has no line of sight on the grid.
+    """
+    skeleton = medial_axis(invert(grid.astype(bool)))
+    skel_start, skel_goal = find_start_goal(skeleton, start, goal, grid=grid)
+    if not (line_of_sight(grid, start, tuple(skel_start)) and line_of_sight(grid, tuple(skel_goal), goal)):
+        return []
+    skeleton_grid = invert(skeleton).view(np.uint8)
+    path, _ = ara_star(skeleton_grid, tuple(skel_start), tuple(skel_goal), deadline,
+                       mask=neighbor_mask(skeleton_grid, corners=False))
+    if not path:
+        return []
+    return [start] + path + [goal]
+
+
+def prm_planner(grid, start, goal, deadline, num_samples=600, k=10, seed=None):
+    """
+    Probabilistic roadmap: random free cells joined to their k nearest
+    neighbours where the grid gives a line of sight, searched with A*.
+    """
+    free = np.argwhere(grid == 0)
+    rng = np.random.RandomState(seed)
+    samples = free[rng.choice(len(free), min(num_samples, len(free)), replace=False)]
+    nodes = [tuple(n) for n in samples.tolist()] + [start, goal]
+    tree = KDTree(np.array(nodes))
+    g = nx.Graph()
+    g.add_nodes_from(nodes)
+    for n1, idxs in zip(nodes, tree.query(np.array(nodes), k + 1, return_distance=False)):
+        for idx in idxs:
+            n2 = nodes[idx]
+            if n2 != n1 and not g.has_edge(n1, n2) and line_of_sight(grid, n1, n2):
+                g.add_edge(n1, n2, weight=float(LA.norm(np.subtract(n1, n2))))
+    try:
+        return nx.astar_path(g, start, goal, heuristic=lambda a, b: float(LA.norm(np.subtract(a, b))))
+    except nx.NetworkXNoPath:
+        return []
+
+
+PLANNERS = {'grid': grid_planner, 'skeleton': skeleton_planner, 'prm': prm_planner}
+
+
+def run_portfolio(grid, start, goal, time_limit, mode='best', planners=None, record=None):
+    """
+    Races several planners on the same query in a process pool.
+
+    Every planner gets the same deadline. With mode 'first' the first valid
+    path is returned as soon as it arrives, with mode 'best' the shortest
+    path among the planners that finish before the deadline. Planners still
+    running when the portfolio returns are terminated.
+
+    Returns the path (a list of cells), its length and the name of the
+    winning planner. If record is a filename, the winner and every planner's
+    result are appended to it as a JSON line.
+    """
+    if mode not in ('first', 'best'):
+        raise ValueError("mode must be 'first' or 'best'")
+    if planners is None:
+        planners = list(PLANNERS)
+    grid = np.ascontiguousarray(grid, dtype=np.uint8)
+    start, goal = tuple(int(v) for v in start), tuple(int(v) for v in goal)
+    began = time.time()
+    deadline = began + time_limit
+
+    results = {}
+    best = ([], 0, None)
+    pool = Pool(len(planners))
+    try:
+        pending = {name: pool.apply_async(PLANNERS[name], (grid, start, goal, deadline)) for name in planners}
+        while pending and time.time() < deadline:
+            for name in [name for name, result in pending.items() if result.ready()]:
+                try:
+                    path = [tuple(int(v) for v in p) for p in pending.pop(name).get()]
+                except Exception as e:
+                    print('Planner {0} failed: {1}'.format(name, e))
+                    path = []
+                cost = path_length(path)
+                results[name] = {'time': time.time() - began, 'cost': cost if path else None}
+                if path and (best[2] is None or cost < best[1]):
+                    best = (path, cost, name)
+            if best[2] is not None and mode == 'first':
+                break
+            time.sleep(0.01)
+    finally:
+        pool.terminate()
+        pool.join()
+    for name in pending:
+        results[name] = {'time': None, 'cost': None}
+
+    path, cost, winner = best
+    if winner is None:
+        print('**********************')
+        print('Failed to find a path!')
+        print('**********************')
+    else:
+        print('Found a path with the {0} planner.'.format(winner))
+    if record is not None:
+        append_record(record, {
+            'time': began, 'map': hashlib.sha1(grid.tobytes()).hexdigest(), 'shape': grid.shape,
+            'start': start, 'goal': goal, 'mode': mode, 'time_limit': time_limit, 'winner': winner,
+            'cost': cost, 'planners': results})
+    return path, cost, winner
@@ -0,0 +1,68 @@
+import inspect
+import os
+
+import numpy as np
+
+from planning_utils import grid_digest
+
+
+class Precomputed:
+    """
+    Saving, loading and caching for structures precomputed from a grid or
+    skeleton, stored as .npz files tagged with the digest of their source.
+
+    A subclass is built as cls(source, **params) and sets self._digest to
+    `source_digest(source)`. It implements `_arrays`, the arrays to save,
+    and `_restore`, which rebuilds it from them. `_params` returns the
+    build parameters `cached` checks against.
+    """
+
+    @staticmethod
+    def source_digest(source):
+        return grid_digest(source)
+
+    def _params(self):
+        return {}
+
+    def _arrays(self):
+        raise NotImplementedError
+
+    @classmethod
+    def _restore(cls, source, arrays):
+        raise NotImplementedError
+
+    def save(self, filename):
+        """
+        Writes the structure to a .npz file.
+        """
+        np.savez(filename, digest=self._digest, **self._arrays())
+
+    @classmethod
+    def load(cls, filename, source):
+        """
+        Reads a structure written by `save`, checking it was built for source.
+        """
+        with np.load(filename) as f:
+            if str(f['digest']) != cls.source_digest(source):
+                raise ValueError('{0} was built for a different source'.format(filename))
+            return cls._restore(source, f)
+
+    @classmethod
+    def cached(cls, source, filename, **params):
+        """
+        Loads the structure for source from filename if it was built with the
+        same parameters (the constructor defaults unless given), otherwise
+        builds it and saves it there.
+        """
+        expected = inspect.signature(cls).bind_partial(source, **params)
+        expected.apply_defaults()
+        if os.path.exists(filename):
+            try:
+                loaded = cls.load(filename, source)
+                if all(expected.arguments[k] == v for k, v in loaded._params().items()):
+                    return loaded
+            except ValueError:
+                pass
+        built = cls(source, **params)
+        built.save(filename)
+        return built
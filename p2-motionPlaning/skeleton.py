@@ -0,0 +1,261 @@
+import heapq
+import time
+
+import numpy as np
+
+from planning_utils import euclidean
+from precomputed import Precomputed
+
+_OFFSETS = [(dx, dy, np.sqrt(2) if dx and dy else 1.0)
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1) if dx or dy]
+
+
+class SkeletonGraph(Precomputed):
+    """
+    Sparse graph of a medial-axis skeleton.
+
+    Skeleton pixels with other than two 8-connected neighbours (endpoints
+    and junctions) become nodes. The chains of pixels between them become
+    edges weighted by their length, which keeps every path along the
+    skeleton and its cost. A search only visits a few thousand nodes
+    instead of every skeleton pixel.
+
+    Every chain pixel maps to its edge and its distance from the edge's
+    first node, so `plan` accepts any skeleton pixel as start or goal.
+    `anchors`, `direct` and `route` let other searches over the graph, such
+    as `ContractionHierarchy`, do the same.
+    """
+
+    def __init__(self, skeleton, nodes=None, edges=None, costs=None, chains=None, offsets=None):
+        self._shape = np.shape(skeleton)
+        self._digest = self.source_digest(skeleton)
+        if nodes is None:
+            nodes, edges, costs, chains, offsets = self._trace(np.asarray(skeleton, dtype=bool))
+        self._nodes = np.asarray(nodes, dtype=np.int32).reshape(-1, 2)
+        self._edges = np.asarray(edges, dtype=np.int32).reshape(-1, 2)
+        self._costs = np.asarray(costs, dtype=np.float64)
+        # interior pixels of every edge, concatenated, with their distance from the first node
+        self._chains = np.asarray(chains, dtype=np.float64).reshape(-1, 3)
+        self._offsets = np.asarray(offsets, dtype=np.int64)
+
+        self._node_of = np.full(self._shape, -1, dtype=np.int32)
+        self._node_of[self._nodes[:, 0], self._nodes[:, 1]] = np.arange(len(self._nodes))
+        pixels = self._chains[:, :2].astype(int)
+        self._edge_of = np.full(self._shape, -1, dtype=np.int32)
+        self._edge_of[pixels[:, 0], pixels[:, 1]] = np.repeat(np.arange(len(self._edges)), np.diff(self._offsets))
+        self._index_of = np.zeros(self._shape, dtype=np.int64)
+        self._index_of[pixels[:, 0], pixels[:, 1]] = np.arange(len(pixels))
+
+        self._adjacency = [[] for _ in range(len(self._nodes))]
+        for e, (u, v) in enumerate(self._edges.tolist()):
+            self._adjacency[u].append((v, e))
+            if u != v:
+                self._adjacency[v].append((u, e))
+
+    @property
+    def nodes(self):
+        return self._nodes
+
+    @property
+    def edges(self):
+        return self._edges
+
+    @property
+    def costs(self):
+        return self._costs
+
+    @property
+    def digest(self):
+        return self._digest
+
+    @staticmethod
+    def _trace(skeleton):
+        """
+        Returns the nodes, edges, edge costs and chains of the skeleton.
+        """
+        rows, cols = skeleton.shape
+        padded = np.pad(skeleton, 1, mode='constant')
+        degree = sum(padded[1 + dx:rows + 1 + dx, 1 + dy:cols + 1 + dy].astype(int) for dx, dy, _ in _OFFSETS)
+        node_of = np.full(skeleton.shape, -1, dtype=np.int64)
+        nodes = [tuple(p) for p in np.argwhere(skeleton & (degree != 2)).tolist()]
+        for i, p in enumerate(nodes):
+            node_of[p] = i
+        visited = np.zeros(skeleton.shape, dtype=bool)
+
+        def neighbors(p):
+            for dx, dy, cost in _OFFSETS:
+                q = (p[0] + dx, p[1] + dy)
+                if 0 <= q[0] < rows and 0 <= q[1] < cols and skeleton[q]:
+                    yield q, cost
+
+        edges, costs, chains, offsets = [], [], [], [0]
+
+        def add_edge(u, v, chain, length):
+            edges.append((u, v))
+            costs.append(length)
+            chains.extend((p[0], p[1], along) for p, along in chain)
+            offsets.append(len(chains))
+
+        def trace_from(u):
+            for q, step in neighbors(nodes[u]):
+                if node_of[q] >= 0:
+                    # neighbouring nodes, add the edge once
+                    if u < node_of[q]:
+                        add_edge(u, node_of[q], [], step)
+                    continue
+                if visited[q]:
+                    continue
+                chain = []
+                previous, current, length = nodes[u], q, step
+                while node_of[current] < 0:
+                    visited[current] = True
+                    chain.append((current, length))
+                    r, c = [(r, c) for r, c in neighbors(current) if r != previous][0]
+                    previous, current, length = current, r, length + c
+                end = node_of[current]
+                if end != u:
+                    add_edge(u, end, chain, length)
+                    continue
+                # a chain back to its own node is split in two at a new node
+                middle, middle_length = chain[len(chain) // 2]
+                node_of[middle] = len(nodes)
+                nodes.append(middle)
+                add_edge(u, node_of[middle], chain[:len(chain) // 2], middle_length)
+                add_edge(node_of[middle], u, [(p, along - middle_length) for p, along in chain[len(chain) // 2 + 1:]],
+                         length - middle_length)
+
+        for u in range(len(nodes)):
+            trace_from(u)
+        # closed loops without a junction get one of their pixels as node
+        for p in np.argwhere(skeleton & ~visited & (node_of < 0)).tolist():
+            p = tuple(p)
+            if visited[p] or node_of[p] >= 0:
+                continue
+            node_of[p] = len(nodes)
+            nodes.append(p)
+            trace_from(node_of[p])
+        return nodes, edges, costs, chains, offsets
+
+    def anchors(self, pixel):
+        """
+        Returns (node, cost) pairs for the graph nodes next to a skeleton pixel.
+        """
+        node = self._node_of[pixel]
+        if node >= 0:
+            return [(int(node), 0.0)]
+        e = self._edge_of[pixel]
+        if e < 0:
+            raise ValueError('{0} is not a skeleton pixel'.format(pixel))
+        u, v = self._edges[e].tolist()
+        along = self._chains[self._index_of[pixel], 2]
+        return [(u, along), (v, self._costs[e] - along)]
+
+    def direct(self, start, goal):
+        """
+        Returns the path and cost from start to goal along the chain they
+        share, or ([], inf) if they are not on the same chain.
+        """
+        if start == goal:
+            return [start], 0.0
+        e = self._edge_of[start]
+        if self._node_of[start] >= 0 or e != self._edge_of[goal]:
+            return [], np.inf
+        pixels = self._edge_pixels(e, int(self._edges[e][0]))
+        i, j = pixels.index(start), pixels.index(goal)
+        path = pixels[i:j + 1] if i <= j else pixels[j:i + 1][::-1]
+        return path, abs(self._chains[self._index_of[start], 2] - self._chains[self._index_of[goal], 2])
+
+    def _edge_pixels(self, e, first, source=None):
+        """
+        Returns the pixels of edge e from node `first` to its other end, or
+        with source, from that pixel on the edge to node `first`.
+        """
+        u, v = self._edges[e].tolist()
+        chain = [tuple(p) for p in self._chains[self._offsets[e]:self._offsets[e + 1], :2].astype(int).tolist()]
+        pixels = [tuple(self._nodes[u])] + chain + [tuple(self._nodes[v])]
+        if source is not None:
+            i = pixels.index(source)
+            return pixels[i::-1] if first == u else pixels[i:]
+        return pixels if first == u else pixels[::-1]
+
+    def plan(self, start, goal, stats=None):
+        """
+        Returns the path between two skeleton pixels and its cost.
+        """
+        search_start = time.perf_counter()
+        start, goal = tuple(int(v) for v in start), tuple(int(v) for v in goal)
+        goal_anchors = dict(self.anchors(goal))
+        direct_path, best_cost = self.direct(start, goal)
+        best_node = None
+
+        g_cost, parent = {}, {}
+        queue = []
+        for node, cost in self.anchors(start):
+            if cost < g_cost.get(node, np.inf):
+                g_cost[node], parent[node] = cost, None
+                heapq.heappush(queue, (cost + euclidean(self._nodes[node], goal), node))
+        closed = set()
+        pushed = peak_open = len(queue)
+        while queue:
+            f, node = heapq.heappop(queue)
+            if f >= best_cost:
+                break
+            if node in closed:
+                continue
+            closed.add(node)
+            cost = g_cost[node]
+            if node in goal_anchors and cost + goal_anchors[node] < best_cost:
+                best_cost, best_node = cost + goal_anchors[node], node
+            for nxt, e in self._adjacency[node]:
+                next_cost = cost + self._costs[e]
+                if nxt not in closed and next_cost < g_cost.get(nxt, np.inf):
+                    g_cost[nxt], parent[nxt] = next_cost, (node, e)
+                    heapq.heappush(queue, (next_cost + euclidean(self._nodes[nxt], goal), nxt))
+                    pushed += 1
+            peak_open = max(peak_open, len(queue))
+
+        reconstruction_start = time.perf_counter()
+        path = []
+        if best_cost == np.inf:
+            print('**********************')
+            print('Failed to find a path!')
+            print('**********************')
+            best_cost = 0
+        else:
+            print('Found a path.')
+            if best_node is None:
+                path = direct_path
+            else:
+                path = self.route(start, goal, best_node, parent)
+        if stats is not None:
+            stats.record(len(closed), pushed, peak_open, search_start, reconstruction_start)
+        return path, best_cost
+
+    def route(self, start, goal, last, parent):
+        """
+        Returns the pixels from start through the graph nodes ending at node
+        last to goal. parent maps every node on the way to its (previous
+        node, edge), and the first node, next to start, to None.
+        """
+        legs = []
+        node = last
+        while parent[node] is not None:
+            previous, e = parent[node]
+            legs.append(self._edge_pixels(e, previous)[1:])
+            node = previous
+        path = [start]
+        if self._node_of[start] < 0:
+            path = self._edge_pixels(self._edge_of[start], node, source=start)
+        for leg in reversed(legs):
+            path += leg
+        if self._node_of[goal] < 0:
+            path += self._edge_pixels(self._edge_of[goal], last, source=goal)[::-1][1:]
+        return path
+
+    def _arrays(self):
+        return {'shape': self._shape, 'nodes': self._nodes, 'edges': self._edges, 'costs': self._costs,
+                'chains': self._chains, 'offsets': self._offsets}
+
+    @classmethod
+    def _restore(cls, skeleton, arrays):
+        return cls(skeleton, arrays['nodes'], arrays['edges'], arrays['costs'], arrays['chains'], arrays['offsets'])
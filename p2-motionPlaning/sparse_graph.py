@@ -0,0 +1,95 @@
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from planning_utils import Action, neighbor_mask
+
+
+def grid_to_csr(grid, mask=None):
+    """
+    Returns the 8-connected move graph of the grid as a CSR adjacency matrix.
+
+    Row and column indices are flat cell indices (row * cols + col) and the
+    entries are the move costs, using the same moves as `neighbor_mask`.
+    """
+    if mask is None:
+        mask = neighbor_mask(grid)
+    rows, cols = mask.shape
+    flat_mask = mask.ravel()
+    sources, targets, costs = [], [], []
+    for bit, action in enumerate(Action):
+        dx, dy = action.delta
+        cells = np.flatnonzero(flat_mask >> bit & 1)
+        sources.append(cells)
+        targets.append(cells + dx * cols + dy)
+        costs.append(np.full(len(cells), action.cost))
+    size = rows * cols
+    return csr_matrix((np.concatenate(costs), (np.concatenate(sources), np.concatenate(targets))),
+                      shape=(size, size))
+
+
+def roadmap_to_csr(graph, weight='weight'):
+    """
+    Returns a networkx roadmap as a CSR adjacency matrix and the node list
+    giving the node for every row index. Undirected edges go both ways.
+    """
+    nodes = list(graph.nodes)
+    index = {n: i for i, n in enumerate(nodes)}
+    sources, targets, costs = [], [], []
+    for u, v, data in graph.edges(data=True):
+        cost = data.get(weight, 1.0)
+        sources.append(index[u])
+        targets.append(index[v])
+        costs.append(cost)
+        if not graph.is_directed():
+            sources.append(index[v])
+            targets.append(index[u])
+            costs.append(cost)
+    return csr_matrix((costs, (sources, targets)), shape=(len(nodes), len(nodes))), nodes
+
+
+def csr_path(predecessors, source, target):
+    """
+    Returns the node indices from source to target read from a dijkstra predecessor row.
+    """
+    if source != target and predecessors[target] < 0:
+        return []
+    path = [target]
+    while path[-1] != source:
+        path.append(int(predecessors[path[-1]]))
+    return path[::-1]
+
+
+def shortest_paths(graph, pairs, chunk=16):
+    """
+    Solves (source, target) index queries on a CSR graph with scipy's C Dijkstra.
+
+    Queries sharing a source are answered from one search, and up to chunk
+    sources are searched per call. Returns (path, cost) per pair, in order,
+    with path as a list of node indices.
+    """
+    targets = {}
+    for s, t in pairs:
+        targets.setdefault(s, set()).add(t)
+    sources = sorted(targets)
+    results = {}
+    for i in range(0, len(sources), chunk):
+        batch = sources[i:i + chunk]
+        dist, predecessors = dijkstra(graph, indices=batch, return_predecessors=True)
+        for row, s in enumerate(batch):
+            for t in targets[s]:
+                path = csr_path(predecessors[row], s, t)
+                results[(s, t)] = (path, float(dist[row, t])) if path else ([], 0)
+    return [results[pair] for pair in pairs]
+
+
+def grid_shortest_paths(grid, pairs, mask=None, chunk=16):
+    """
+    Solves (start, goal) cell queries on the grid through its CSR graph.
+
+    Returns (path, cost) per pair, in order, with path as a list of cells.
+    """
+    graph = grid_to_csr(grid, mask)
+    cols = np.shape(grid)[1]
+    flat_pairs = [(int(s[0]) * cols + int(s[1]), int(g[0]) * cols + int(g[1])) for s, g in pairs]
+    return [([divmod(int(i), cols) for i in path], cost) for path, cost in shortest_paths(graph, flat_pairs, chunk)]
@@ -0,0 +1,29 @@
+import numpy as np
+
+from contraction import ContractionHierarchy
+from skeleton import SkeletonGraph
+from test_skeleton import assert_skeleton_path, skeleton_a_star, skeleton_map, skeleton_queries
+
+
+def test_contraction_hierarchy_matches_a_star():
+    skeleton = skeleton_map()
+    hierarchy = ContractionHierarchy(SkeletonGraph(skeleton))
+    queries = skeleton_queries(skeleton, 3) + [(p, p) for p, _ in skeleton_queries(skeleton, 4, 3)]
+    for start, goal in queries:
+        expected_path, expected_cost = skeleton_a_star(skeleton, start, goal)
+        path, cost = hierarchy.plan(start, goal)
+        if not expected_path:
+            assert not path
+            continue
+        assert_skeleton_path(skeleton, path, start, goal)
+        assert np.isclose(cost, expected_cost)
+
+
+def test_contraction_hierarchy_save_and_load(tmp_path):
+    skeleton = skeleton_map(200)
+    graph = SkeletonGraph(skeleton)
+    filename = str(tmp_path / 'hierarchy.npz')
+    hierarchy = ContractionHierarchy.cached(graph, filename)
+    loaded = ContractionHierarchy.cached(graph, filename)
+    for start, goal in skeleton_queries(skeleton, 5, 5):
+        assert loaded.plan(start, goal) == hierarchy.plan(start, goal)
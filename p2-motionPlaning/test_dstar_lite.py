@@ -0,0 +1,60 @@
+import numpy as np
+
+from dstar_lite import DStarLite
+from planning_utils import a_star
+from test_planning_utils import assert_valid_path, path_cost, random_grid, random_queries
+
+
+def assert_matches_a_star(planner, goal):
+    expected_path, expected_cost = a_star(planner.grid, planner.start, goal)
+    path, cost = planner.plan()
+    if not expected_path:
+        assert not path
+        return
+    assert_valid_path(planner.grid, path, planner.start, goal)
+    assert np.isclose(cost, expected_cost)
+    assert np.isclose(path_cost(path), cost)
+
+
+def planners(seeds=range(3), count=8):
+    for seed in seeds:
+        grid = random_grid(seed, density=0.25)
+        for start, goal in random_queries(grid, seed, count):
+            yield DStarLite(grid, start, goal), goal
+
+
+def test_plan_matches_a_star():
+    for planner, goal in planners():
+        assert_matches_a_star(planner, goal)
+
+
+def test_plan_after_move_to():
+    for planner, goal in planners():
+        path, _ = planner.plan()
+        for step in (3, 4, 10):
+            if len(path) <= step:
+                break
+            planner.move_to(path[step])
+            assert_matches_a_star(planner, goal)
+            path, _ = planner.plan()
+
+
+def test_plan_after_update_cells():
+    rng = np.random.RandomState(0)
+    for planner, goal in planners():
+        path, _ = planner.plan()
+        # block part of the current path, then free some obstacles around it
+        blocked = [p for p in path[1:-1] if rng.uniform() < 0.3]
+        planner.update_cells(blocked)
+        assert_matches_a_star(planner, goal)
+
+        obstacles = [tuple(p) for p in np.argwhere(planner.grid == 1).tolist()]
+        freed = [obstacles[i] for i in rng.choice(len(obstacles), 40, replace=False)]
+        planner.update_cells(freed, occupied=False)
+        assert_matches_a_star(planner, goal)
+
+        path, _ = planner.plan()
+        if len(path) > 5:
+            planner.move_to(path[2])
+            planner.update_cells([path[4]])
+            assert_matches_a_star(planner, goal)
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from grid import OccupancyGrid, create_grid, create_height_map, grid_from_height_map
+
+COLLIDERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colliders.csv')
+
+
+def loop_grid(data, drone_altitude, safety_distance):
+    """
+    The original create_grid, which filled one obstacle box at a time.
+    """
+    north_min = np.floor(np.min(data[:, 0] - data[:, 3]))
+    north_max = np.ceil(np.max(data[:, 0] + data[:, 3]))
+    east_min = np.floor(np.min(data[:, 1] - data[:, 4]))
+    east_max = np.ceil(np.max(data[:, 1] + data[:, 4]))
+    north_size = int(np.ceil(north_max - north_min))
+    east_size = int(np.ceil(east_max - east_min))
+    grid = np.zeros((north_size, east_size))
+    for i in range(data.shape[0]):
+        north, east, alt, d_north, d_east, d_alt = data[i, :]
+        if alt + d_alt + safety_distance > drone_altitude:
+            obstacle = [
+                int(np.clip(north - d_north - safety_distance - north_min, 0, north_size - 1)),
+                int(np.clip(north + d_north + safety_distance - north_min, 0, north_size - 1)),
+                int(np.clip(east - d_east - safety_distance - east_min, 0, east_size - 1)),
+                int(np.clip(east + d_east + safety_distance - east_min, 0, east_size - 1)),
+            ]
+            grid[obstacle[0]:obstacle[1] + 1, obstacle[2]:obstacle[3] + 1] = 1
+    return grid, int(north_min), int(east_min)
+
+
+def colliders():
+    return np.loadtxt(COLLIDERS, delimiter=',', dtype=np.float64, skiprows=2)
+
+
+def random_colliders(seed, count=300):
+    """
+    Random boxes with fractional centres and sizes, some of them overlapping the map border.
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.uniform([-200, -150, 0], [200, 150, 40], (count, 3))
+    halves = rng.uniform(0.2, 15, (count, 3))
+    return np.hstack([centers, halves])
+
+
+def test_create_grid_matches_loop_on_colliders():
+    data = colliders()
+    for drone_altitude, safety_distance in [(5, 5), (0, 0), (20, 3), (212, 0)]:
+        grid, north_offset, east_offset = create_grid(data, drone_altitude, safety_distance)
+        expected, expected_north, expected_east = loop_grid(data, drone_altitude, safety_distance)
+        assert (north_offset, east_offset) == (expected_north, expected_east)
+        np.testing.assert_array_equal(grid, expected)
+
+
+def test_create_grid_matches_loop_on_random_boxes():
+    for seed in range(5):
+        data = random_colliders(seed)
+        for drone_altitude, safety_distance in [(5, 2.5), (30, 0), (0, 7)]:
+            grid, _, _ = create_grid(data, drone_altitude, safety_distance)
+            np.testing.assert_array_equal(grid, loop_grid(data, drone_altitude, safety_distance)[0])
+
+
+def test_height_map_matches_create_grid():
+    for data in [colliders(), random_colliders(7)]:
+        for safety_distance in [0, 5, 2.5]:
+            heights, north_offset, east_offset = create_height_map(data, safety_distance)
+            for drone_altitude in [0, 5, 12.5, 60]:
+                grid, expected_north, expected_east = create_grid(data, drone_altitude, safety_distance)
+                assert (north_offset, east_offset) == (expected_north, expected_east)
+                np.testing.assert_array_equal(grid_from_height_map(heights, drone_altitude), grid)
+
+
+def test_occupancy_grid_indexing():
+    cells = (np.random.RandomState(0).uniform(size=(13, 21)) < 0.4).astype(np.float64)
+    for grid in (OccupancyGrid(cells), OccupancyGrid(cells, packed=True)):
+        np.testing.assert_array_equal(grid.unpack(), cells)
+        for x, y in [(0, 0), (12, 20), (-1, -1), (5, -21), (7, 3)]:
+            assert grid[x, y] == cells[x, y]
+        np.testing.assert_array_equal(grid[2:5, 3], cells[2:5, 3])
+        for key in [(13, 0), (0, 21), (-14, 0)]:
+            with pytest.raises(IndexError):
+                grid[key]
+    assert OccupancyGrid(cells, packed=True).nbytes == (13 * 21 + 7) // 8
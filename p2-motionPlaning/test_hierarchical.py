@@ -0,0 +1,32 @@
+import numpy as np
+
+from hierarchical import HierarchicalPlanner
+from planning_utils import a_star
+from test_planning_utils import assert_valid_path, path_cost, random_grid, random_queries
+
+
+def test_paths_are_valid_and_no_shorter_than_a_star():
+    for seed in range(3):
+        grid = random_grid(seed, shape=(70, 90), density=0.2)
+        planner = HierarchicalPlanner(grid, cluster_size=16)
+        for start, goal in random_queries(grid, seed):
+            expected_path, expected_cost = a_star(grid, start, goal)
+            path, cost = planner.plan(start, goal)
+            if not expected_path:
+                assert not path
+                continue
+            assert_valid_path(grid, path, start, goal)
+            # in-cluster distances are float32
+            assert cost >= expected_cost * (1 - 1e-6)
+            assert np.isclose(path_cost(path), cost)
+
+
+def test_cached_reuses_the_saved_graph(tmp_path):
+    grid = random_grid(4, density=0.2)
+    filename = str(tmp_path / 'hierarchical.npz')
+    planner = HierarchicalPlanner.cached(grid, filename, cluster_size=16)
+    loaded = HierarchicalPlanner.cached(grid, filename, cluster_size=16)
+    assert loaded.nodes == planner.nodes and loaded.cluster_size == 16
+    assert HierarchicalPlanner.cached(grid, filename).cluster_size == 32
+    for start, goal in random_queries(grid, 4, 5):
+        assert loaded.plan(start, goal) == planner.plan(start, goal)
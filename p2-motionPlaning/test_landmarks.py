@@ -0,0 +1,28 @@
+import numpy as np
+
+from landmarks import LandmarkHeuristic
+from planning_utils import a_star, octile
+from test_planning_utils import check_against_a_star, random_grid, random_queries
+
+
+def test_a_star_with_landmarks_matches_a_star():
+    for seed in range(3):
+        heuristic = LandmarkHeuristic(random_grid(seed), num_landmarks=4)
+        check_against_a_star(lambda grid, start, goal: a_star(grid, start, goal, h=heuristic), seeds=[seed])
+
+
+def test_a_star_with_landmark_field_matches_a_star():
+    for seed in range(3):
+        heuristic = LandmarkHeuristic(random_grid(seed), num_landmarks=4)
+        check_against_a_star(lambda grid, start, goal: a_star(grid, start, goal, h=heuristic.field(goal)),
+                             seeds=[seed])
+
+
+def test_landmarks_bound_the_true_distance():
+    grid = random_grid(5, density=0.2)
+    heuristic = LandmarkHeuristic(grid, num_landmarks=4)
+    for start, goal in random_queries(grid, 5):
+        path, cost = a_star(grid, start, goal)
+        if path:
+            assert octile(start, goal) <= heuristic(start, goal) <= cost * (1 + 1e-6)
+            assert np.isclose(heuristic.field(goal)[start], heuristic(start, goal))
@@ -0,0 +1,108 @@
+import os
+import shutil
+
+import numpy as np
+
+from grid import create_grid
+from hierarchical import HierarchicalPlanner
+from landmarks import LandmarkHeuristic
+from map_bundle import MapBundle
+
+COLLIDERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colliders.csv')
+CONFIGS = [(5, 5), (10, 0)]
+
+
+def copy_colliders(tmp_path):
+    colliders = str(tmp_path / 'colliders.csv')
+    shutil.copy(COLLIDERS, colliders)
+    return colliders
+
+
+def small_colliders(tmp_path, seed=0, count=40):
+    """
+    Writes a colliders file with random boxes on a map of about 120 x 120 cells.
+    """
+    rng = np.random.RandomState(seed)
+    boxes = np.hstack([rng.uniform([-60, -60, 0], [60, 60, 20], (count, 3)), rng.uniform(1, 6, (count, 3))])
+    colliders = str(tmp_path / 'small.csv')
+    with open(colliders, 'w') as f:
+        f.write('lat0 37.792480, lon0 -122.397450\nposX,posY,posZ,halfSizeX,halfSizeY,halfSizeZ\n')
+        np.savetxt(f, boxes, delimiter=',')
+    return colliders
+
+
+def load(colliders):
+    return np.loadtxt(colliders, delimiter=',', dtype=np.float64, skiprows=2)
+
+
+def assert_grids(bundle, data):
+    for drone_altitude, safety_distance in CONFIGS:
+        grid, north_offset, east_offset = create_grid(data, drone_altitude, safety_distance)
+        np.testing.assert_array_equal(bundle.grid(drone_altitude, safety_distance), grid)
+        assert bundle.offsets == (north_offset, east_offset)
+
+
+def test_bundle_grids_match_create_grid(tmp_path):
+    colliders = copy_colliders(tmp_path)
+    bundle = MapBundle.open(colliders, str(tmp_path / 'bundle'), CONFIGS)
+    data = load(colliders)
+    assert_grids(bundle, data)
+    np.testing.assert_array_equal(bundle.colliders, data)
+    assert bundle.home == (37.79248, -122.39745)
+    assert bundle.skeleton(5, 5).dtype == bool
+
+
+def test_bundle_recompiles_when_colliders_change(tmp_path, capsys):
+    colliders = copy_colliders(tmp_path)
+    directory = str(tmp_path / 'bundle')
+    MapBundle.open(colliders, directory, CONFIGS)
+    assert 'Compiling' in capsys.readouterr().out
+
+    MapBundle.open(colliders, directory, CONFIGS)
+    assert 'Compiling' not in capsys.readouterr().out
+
+    # touching the file is enough
+    stat = os.stat(colliders)
+    os.utime(colliders, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    MapBundle.open(colliders, directory, CONFIGS)
+    assert 'Compiling' in capsys.readouterr().out
+
+    # drop the first obstacle, the grids must follow the new file
+    with open(colliders) as f:
+        lines = f.readlines()
+    with open(colliders, 'w') as f:
+        f.writelines(lines[:2] + lines[3:])
+    bundle = MapBundle.open(colliders, directory, CONFIGS)
+    assert 'Compiling' in capsys.readouterr().out
+    assert_grids(bundle, load(colliders))
+
+
+def test_bundle_adds_missing_configurations(tmp_path, capsys):
+    colliders = copy_colliders(tmp_path)
+    directory = str(tmp_path / 'bundle')
+    MapBundle.open(colliders, directory, CONFIGS[:1])
+    bundle = MapBundle.open(colliders, directory, CONFIGS[1:])
+    assert capsys.readouterr().out.count('Compiling') == 2
+    assert not bundle.stale(colliders, CONFIGS)
+    assert_grids(bundle, load(colliders))
+
+
+def test_bundle_keeps_the_hierarchical_planner(tmp_path):
+    colliders = small_colliders(tmp_path)
+    directory = str(tmp_path / 'bundle')
+    bundle = MapBundle.open(colliders, directory)
+    planner = bundle.hierarchical_planner(5, 5, cluster_size=16)
+    loaded = HierarchicalPlanner.load(os.path.join(directory, 'hierarchical_5_5.npz'), bundle.grid(5, 5))
+    assert loaded.nodes == planner.nodes
+    assert MapBundle.open(colliders, directory).hierarchical_planner(5, 5, cluster_size=16).nodes == planner.nodes
+
+
+def test_bundle_keeps_the_landmark_heuristic(tmp_path):
+    colliders = small_colliders(tmp_path)
+    directory = str(tmp_path / 'bundle')
+    bundle = MapBundle.open(colliders, directory)
+    heuristic = bundle.landmark_heuristic(5, 5, num_landmarks=4)
+    loaded = LandmarkHeuristic.load(os.path.join(directory, 'landmarks_5_5.npz'), bundle.grid(5, 5))
+    assert loaded.landmarks == heuristic.landmarks
+    reopened = MapBundle.open(colliders, directory).landmark_heuristic(5, 5, num_landmarks=4)
+    assert reopened.landmarks == heuristic.landmarks
@@ -0,0 +1,45 @@
+import os
+import shutil
+import time
+
+from plan_cache import PlanCache
+
+COLLIDERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colliders.csv')
+PATH = [(0, 0), (1, 1), (2, 1)]
+
+
+def copy_colliders(tmp_path):
+    colliders = str(tmp_path / 'colliders.csv')
+    shutil.copy(COLLIDERS, colliders)
+    return colliders
+
+
+def test_entries_survive_a_new_cache(tmp_path):
+    colliders = copy_colliders(tmp_path)
+    directory = str(tmp_path / 'cache')
+    PlanCache(directory).put(colliders, 5, 5, (0, 0), (2, 1), PATH, 2.41)
+    path, cost = PlanCache(directory).get(colliders, 5.0, 5.0, (0, 0), (2, 1))
+    assert path == PATH and cost == 2.41
+    assert PlanCache(directory).get(colliders, 5, 5, (0, 0), (2, 2)) is None
+
+
+def test_changed_colliders_miss(tmp_path):
+    colliders = copy_colliders(tmp_path)
+    cache = PlanCache(str(tmp_path / 'cache'))
+    cache.put(colliders, 5, 5, (0, 0), (2, 1), PATH, 2.41)
+    with open(colliders, 'a') as f:
+        f.write('0,0,0,1,1,1\n')
+    assert cache.get(colliders, 5, 5, (0, 0), (2, 1)) is None
+
+
+def test_directory_is_capped(tmp_path):
+    colliders = copy_colliders(tmp_path)
+    directory = str(tmp_path / 'cache')
+    cache = PlanCache(directory, max_files=3)
+    for i in range(5):
+        cache.put(colliders, 5, 5, (0, 0), (i, 0), PATH, 2.41)
+        time.sleep(0.02)
+    assert len(os.listdir(directory)) == 3
+    fresh = PlanCache(directory, max_files=3)
+    assert fresh.get(colliders, 5, 5, (0, 0), (0, 0)) is None
+    assert fresh.get(colliders, 5, 5, (0, 0), (4, 0)) is not None
@@ -0,0 +1,149 @@
+import time
+
+import numpy as np
+import pytest
+
+from planning_utils import (SearchStats, SkeletonIndex, a_star, a_star_flat, ara_star, bidirectional_a_star,
+                            distance_field, field_path, find_start_goal, jump_point_search, theta_star)
+
+
+def random_grid(seed, shape=(60, 70), density=0.3):
+    rng = np.random.RandomState(seed)
+    return (rng.uniform(size=shape) < density).astype(np.float64)
+
+
+def random_queries(grid, seed, count=20):
+    rng = np.random.RandomState(seed)
+    free = [tuple(p) for p in np.argwhere(grid == 0).tolist()]
+    return [(free[i], free[j]) for i, j in rng.randint(len(free), size=(count, 2))]
+
+
+def assert_valid_path(grid, path, start, goal):
+    """
+    Checks that path walks from start to goal over free cells with the moves and corner rule of `a_star`.
+    """
+    assert path[0] == start and path[-1] == goal
+    for (x0, y0), (x1, y1) in zip(path[:-1], path[1:]):
+        assert max(abs(x1 - x0), abs(y1 - y0)) == 1
+        assert grid[x1, y1] != 1
+        if x0 != x1 and y0 != y1:
+            assert grid[x1, y0] != 1 or grid[x0, y1] != 1
+
+
+def path_cost(path):
+    steps = np.abs(np.diff(np.array(path), axis=0))
+    return float(np.sum(np.where(steps.sum(axis=1) == 2, np.sqrt(2), 1.0)))
+
+
+def check_against_a_star(planner, seeds=range(4)):
+    for seed in seeds:
+        grid = random_grid(seed)
+        for start, goal in random_queries(grid, seed):
+            expected_path, expected_cost = a_star(grid, start, goal)
+            path, cost = planner(grid, start, goal)
+            if not expected_path:
+                assert not path
+                continue
+            assert_valid_path(grid, path, start, goal)
+            assert np.isclose(cost, expected_cost)
+            assert np.isclose(path_cost(path), cost)
+
+
+def test_a_star_flat_matches_a_star():
+    check_against_a_star(a_star_flat)
+
+
+def test_jump_point_search_matches_a_star():
+    check_against_a_star(jump_point_search)
+
+
+def test_bidirectional_a_star_matches_a_star():
+    check_against_a_star(bidirectional_a_star)
+
+
+def test_bidirectional_a_star_enclosed_goal():
+    grid = random_grid(0)
+    grid[10:15, 10:15] = 1
+    grid[12, 12] = grid[40, 40] = 0
+    path, cost = bidirectional_a_star(grid, (40, 40), (12, 12))
+    assert path == [] and cost == 0
+    path, cost = bidirectional_a_star(grid, (12, 12), (12, 12))
+    assert path == [(12, 12)] and cost == 0
+
+
+def test_ara_star_matches_a_star_with_time_left():
+    check_against_a_star(lambda grid, start, goal: ara_star(grid, start, goal, time.time() + 60))
+
+
+def test_ara_star_returns_at_deadline_without_path():
+    grid = np.zeros((600, 600))
+    grid[500:505, 500:505] = 1
+    grid[502, 502] = 0
+    began = time.time()
+    path, cost = ara_star(grid, (0, 0), (502, 502), began + 0.05)
+    assert path == [] and cost == 0
+    assert time.time() - began < 0.5
+
+
+def test_skeleton_index_nearest():
+    skeleton = np.zeros((20, 20), dtype=bool)
+    skeleton[5, 2:18] = True
+    index = SkeletonIndex(skeleton)
+    np.testing.assert_array_equal(index.nearest((0, 10)), (5, 10))
+    np.testing.assert_array_equal(index.nearest([(0, 10), (19, 0)]), [(5, 10), (5, 2)])
+    nearest = index.nearest((5, 10), k=3)
+    np.testing.assert_array_equal(nearest[0], (5, 10))
+    assert sorted(map(tuple, nearest[1:].tolist())) == [(5, 9), (5, 11)]
+
+
+def test_skeleton_index_small_and_empty_skeletons():
+    index = SkeletonIndex(np.eye(5, dtype=bool))
+    assert len(index.nearest([(0, 0)], k=8).reshape(-1, 2)) == 5
+    start, goal = find_start_goal(np.eye(5, dtype=bool), (0, 1), (4, 3), grid=np.zeros((5, 5)))
+    assert tuple(start) in [(0, 0), (1, 1)] and tuple(goal) in [(4, 4), (3, 3)]
+    with pytest.raises(ValueError):
+        SkeletonIndex(np.zeros((5, 5), dtype=bool))
+
+
+def test_reachable_skips_cells_behind_walls():
+    skeleton = np.zeros((20, 20), dtype=bool)
+    skeleton[5, 8:13] = skeleton[15, :] = True
+    grid = np.zeros((20, 20))
+    grid[7, :] = 1
+    index = SkeletonIndex(skeleton)
+    # (8, 10) is closer to row 5, but the wall at row 7 blocks it
+    np.testing.assert_array_equal(index.nearest((8, 10)), (5, 10))
+    np.testing.assert_array_equal(index.reachable([(8, 10)], grid), [(15, 10)])
+    start, goal = find_start_goal(skeleton, (8, 10), (6, 3), index=index, grid=grid)
+    np.testing.assert_array_equal(start, (15, 10))
+    np.testing.assert_array_equal(goal, (5, 8))
+
+
+def test_planners_fill_search_stats():
+    grid = random_grid(1, density=0.2)
+    start, goal = random_queries(grid, 1, 1)[0]
+    for planner in (a_star, jump_point_search, theta_star, bidirectional_a_star):
+        stats = SearchStats()
+        path, _ = planner(grid, start, goal, stats=stats)
+        assert path
+        assert 0 < stats.expanded <= stats.pushed == stats.heuristic_calls
+        assert stats.peak_open > 0 and stats.expansion_time > 0
+
+
+def test_distance_field_matches_a_star():
+    check_against_a_star(lambda grid, start, goal: field_path(*distance_field(grid, start), goal))
+
+
+def test_reverse_distance_field_matches_a_star():
+    check_against_a_star(
+        lambda grid, start, goal: field_path(*distance_field(grid, goal, reverse=True), start, reverse=True))
+
+
+def test_one_field_answers_many_goals():
+    grid = random_grid(6)
+    start = random_queries(grid, 6, 1)[0][0]
+    cost, parent = distance_field(grid, start)
+    for _, goal in random_queries(grid, 7):
+        _, expected_cost = a_star(grid, start, goal)
+        path, length = field_path(cost, parent, goal)
+        assert np.isclose(length, expected_cost) and bool(path) == np.isfinite(cost[goal])
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+from skimage.morphology import medial_axis
+
+from grid import create_grid
+from planning_utils import a_star, neighbor_mask
+from skeleton import SkeletonGraph
+
+COLLIDERS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'colliders.csv')
+
+
+def skeleton_map(size=400):
+    """
+    Returns the medial-axis skeleton of a corner of the colliders map at 5 m.
+    """
+    data = np.loadtxt(COLLIDERS, delimiter=',', dtype=np.float64, skiprows=2)
+    grid, _, _ = create_grid(data, 5, 5)
+    return medial_axis(grid[:size, :size] == 0)
+
+
+def skeleton_queries(skeleton, seed, count=40):
+    rng = np.random.RandomState(seed)
+    pixels = [tuple(p) for p in np.argwhere(skeleton).tolist()]
+    return [(pixels[i], pixels[j]) for i, j in rng.randint(len(pixels), size=(count, 2))]
+
+
+def skeleton_a_star(skeleton, start, goal):
+    """
+    A* over the skeleton pixels, 8-connected without the corner rule.
+    """
+    skeleton_grid = np.logical_not(skeleton).astype(np.uint8)
+    return a_star(skeleton_grid, start, goal, mask=neighbor_mask(skeleton_grid, corners=False))
+
+
+def assert_skeleton_path(skeleton, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    assert all(skeleton[p] for p in path)
+    steps = np.abs(np.diff(np.array(path), axis=0))
+    assert np.all(steps.max(axis=1) == 1)
+
+
+def test_skeleton_graph_matches_a_star():
+    skeleton = skeleton_map()
+    graph = SkeletonGraph(skeleton)
+    queries = skeleton_queries(skeleton, 0) + [(p, p) for p, _ in skeleton_queries(skeleton, 1, 3)]
+    for start, goal in queries:
+        expected_path, expected_cost = skeleton_a_star(skeleton, start, goal)
+        path, cost = graph.plan(start, goal)
+        if not expected_path:
+            assert not path
+            continue
+        assert_skeleton_path(skeleton, path, start, goal)
+        assert np.isclose(cost, expected_cost)
+
+
+def test_skeleton_graph_save_and_load(tmp_path):
+    skeleton = skeleton_map(200)
+    filename = str(tmp_path / 'graph.npz')
+    graph = SkeletonGraph.cached(skeleton, filename)
+    loaded = SkeletonGraph.load(filename, skeleton)
+    np.testing.assert_array_equal(loaded.nodes, graph.nodes)
+    np.testing.assert_array_equal(loaded.edges, graph.edges)
+    start, goal = skeleton_queries(skeleton, 2, 1)[0]
+    assert loaded.plan(start, goal) == graph.plan(start, goal)